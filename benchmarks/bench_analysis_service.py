@@ -0,0 +1,72 @@
+import argparse
+import http.client
+import json
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+def send_uploads(service_address, image_bytes, upload_count):
+    connection = http.client.HTTPConnection(service_address.hostname, service_address.port or 80, timeout=60)
+    upload_results = []
+    try:
+        for _ in range(upload_count):
+            start_time = time.perf_counter()
+            connection.request("POST", "/analyze", body=image_bytes, headers={"Content-Type": "application/octet-stream"})
+            response = connection.getresponse()
+            response.read()
+            upload_results.append((response.status, time.perf_counter() - start_time, response.getheader("Server-Timing")))
+    finally:
+        connection.close()
+    return upload_results
+
+
+def fetch_metrics(service_address):
+    connection = http.client.HTTPConnection(service_address.hostname, service_address.port or 80, timeout=10)
+    try:
+        connection.request("GET", "/metrics")
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Load a running 'main.py serve' instance with concurrent photo uploads")
+    parser.add_argument("image", help="JPEG or PNG photo containing a face")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="service address (default: http://127.0.0.1:8000)")
+    parser.add_argument("--requests", type=int, default=200, help="total uploads to send")
+    parser.add_argument("--concurrency", type=int, default=8, help="clients uploading at the same time")
+    arguments = parser.parse_args()
+
+    with open(arguments.image, "rb") as image_file:
+        image_bytes = image_file.read()
+    service_address = urlsplit(arguments.url)
+    uploads_per_client = [arguments.requests // arguments.concurrency + (client < arguments.requests % arguments.concurrency)
+                          for client in range(arguments.concurrency)]
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(arguments.concurrency) as client_pool:
+        client_results = list(client_pool.map(lambda upload_count: send_uploads(service_address, image_bytes, upload_count), uploads_per_client))
+    elapsed_seconds = time.perf_counter() - start_time
+
+    upload_results = [upload_result for client_result in client_results for upload_result in client_result]
+    status_counts = Counter(status for status, latency, server_timing in upload_results)
+    latencies_ms = np.array([latency for status, latency, server_timing in upload_results if status == 200]) * 1000
+    if not len(latencies_ms):
+        sys.exit(f"No successful uploads: {dict(status_counts)}")
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+
+    print(f"uploads:              {len(upload_results)} at concurrency {arguments.concurrency}")
+    print(f"status codes:         {dict(sorted(status_counts.items()))}")
+    print(f"throughput:           {status_counts[200] / elapsed_seconds:8.1f} photos/s")
+    print(f"client latency:       p50 {p50:.1f} ms  p95 {p95:.1f} ms  p99 {p99:.1f} ms")
+    print(f"last server timing:   {upload_results[-1][2]}")
+    print(f"service metrics:      {json.dumps(fetch_metrics(service_address))}")
+
+
+if __name__ == "__main__":
+    main_benchmark()
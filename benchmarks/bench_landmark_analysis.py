@@ -0,0 +1,171 @@
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+def legacy_analyze_skin_tone(face_analyzer, image, face_landmarks):
+    height, width = image.shape[:2]
+    sampling_points = [1, 4, 33, 94, 152, 263, 296, 168, 197, 2, 326]
+    sampled_coordinates = []
+    for point in sampling_points:
+        landmark = face_landmarks.landmark[point]
+        x_pos, y_pos = int(landmark.x * width), int(landmark.y * height)
+        if 0 <= x_pos < width and 0 <= y_pos < height:
+            sampled_coordinates.append((x_pos, y_pos))
+    color_samples = [image[y, x] for x, y in sampled_coordinates]
+    if not color_samples:
+        return "could not determine"
+    return face_analyzer.determine_undertone(np.mean(color_samples, axis=0))
+
+
+def legacy_determine_face_structure(landmarks, image_dimensions):
+    height, width = image_dimensions[:2]
+    landmark_points = [(int(landmark.x * width), int(landmark.y * height)) for landmark in landmarks.landmark]
+    jaw_width = abs(landmark_points[454][0] - landmark_points[234][0])
+    forehead_width = abs(landmark_points[21][0] - landmark_points[251][0])
+    face_height = abs(landmark_points[10][1] - landmark_points[152][1])
+    cheek_width = abs(landmark_points[454][0] - landmark_points[234][0])
+    jaw_to_forehead = jaw_width / forehead_width
+    height_to_width = face_height / cheek_width
+    if height_to_width > 1.5:
+        if jaw_to_forehead < 0.85:
+            return "heart (wider forehead, narrow chin)"
+        elif 0.85 <= jaw_to_forehead <= 1.15:
+            return "oval (balanced proportions)"
+        return "oblong (long and narrow)"
+    if jaw_to_forehead > 1.1:
+        return "square (strong jawline)"
+    elif abs(cheek_width - jaw_width) < 0.1 * cheek_width:
+        return "round (similar width and length)"
+    return "diamond (wide cheekbones)"
+
+
+def legacy_analyze_nose_structure(landmarks, image_dimensions):
+    height, width = image_dimensions[:2]
+    landmark_points = [(int(landmark.x * width), int(landmark.y * height)) for landmark in landmarks.landmark]
+    face_width = abs(landmark_points[454][0] - landmark_points[234][0])
+    face_height = abs(landmark_points[10][1] - landmark_points[152][1])
+    nose_width = abs(landmark_points[129][0] - landmark_points[358][0])
+    nose_length = abs(landmark_points[1][1] - landmark_points[4][1])
+    bridge_width = abs(landmark_points[44][0] - landmark_points[276][0])
+    width_proportion = nose_width / face_width
+    length_proportion = nose_length / face_height
+    bridge_proportion = bridge_width / nose_width
+    if width_proportion > 0.25:
+        return "wide with narrow bridge" if bridge_proportion < 0.3 else "wide (broad nostrils)"
+    elif width_proportion < 0.15:
+        return "narrow (slim)"
+    elif length_proportion > 0.3:
+        return "long (prominent)"
+    elif bridge_proportion < 0.25:
+        return "thin (delicate bridge)"
+    elif length_proportion < 0.2:
+        return "short (button-like)"
+    return "balanced (classic proportions)"
+
+
+def legacy_describe_facial_features(landmarks, image_dimensions):
+    height, width = image_dimensions[:2]
+    landmark_points = [(int(landmark.x * width), int(landmark.y * height)) for landmark in landmarks.landmark]
+    eyebrow_thickness = abs(landmark_points[70][1] - landmark_points[105][1])
+    eyebrow_style = "arched" if eyebrow_thickness < 10 else "straight"
+    lip_height = abs(landmark_points[13][1] - landmark_points[14][1])
+    lip_width = abs(landmark_points[78][0] - landmark_points[308][0])
+    lip_ratio = lip_width / max(lip_height, 1)
+    if lip_ratio < 1.2:
+        lip_style = "round"
+    elif lip_height > 16:
+        lip_style = "full"
+    elif lip_height < 8:
+        lip_style = "thin"
+    elif landmark_points[13][1] < landmark_points[14][1] and lip_width > 90:
+        lip_style = "bunny"
+    elif landmark_points[14][1] - landmark_points[13][1] > 12 and lip_width > 95:
+        lip_style = "heart"
+    elif lip_width > 120 and lip_height < 10:
+        lip_style = "diamond"
+    else:
+        lip_style = "balanced"
+    return eyebrow_style, lip_style
+
+
+def run_legacy_analysis(face_analyzer, image_bgr, landmarks):
+    return (
+        legacy_determine_face_structure(landmarks, image_bgr.shape),
+        legacy_describe_facial_features(landmarks, image_bgr.shape),
+        legacy_analyze_nose_structure(landmarks, image_bgr.shape)
+    )
+
+
+def run_vectorized_analysis(face_analyzer, image_bgr, landmarks):
+    landmark_points = main.landmarks_to_array(landmarks, image_bgr.shape)
+    return (
+        face_analyzer.determine_face_structure(landmark_points),
+        face_analyzer.describe_facial_features(landmark_points),
+        face_analyzer.analyze_nose_structure(landmark_points)
+    )
+
+
+def run_point_skin_sampling(face_analyzer, image_bgr, landmarks):
+    return legacy_analyze_skin_tone(face_analyzer, image_bgr, landmarks)
+
+
+def run_polygon_skin_sampling(face_analyzer, image_bgr, landmarks):
+    return face_analyzer.analyze_skin_tone_with_confidence(image_bgr, main.landmarks_to_array(landmarks, image_bgr.shape))
+
+
+def time_per_frame(analysis, face_analyzer, image_bgr, landmarks, iterations):
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        analysis(face_analyzer, image_bgr, landmarks)
+    return (time.perf_counter() - start_time) / iterations
+
+
+def describe_labels(labels):
+    return ", ".join(str(label) for label in labels)
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Per-frame landmark analysis cost: per-analyzer list comprehensions vs. one NumPy array, "
+                                                 "with skin tone sampling timed separately")
+    parser.add_argument("image", help="photo containing a face")
+    parser.add_argument("--iterations", type=int, default=2000)
+    arguments = parser.parse_args()
+
+    image_rgb = cv2.cvtColor(cv2.imread(arguments.image), cv2.COLOR_BGR2RGB)
+    multi_face_landmarks = main.landmark_cache.get_face_landmarks(image_rgb)
+    if not multi_face_landmarks:
+        sys.exit("No face detected in " + arguments.image)
+
+    image_bgr = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
+    face_analyzer = main.FaceAnalyzer()
+    landmarks = multi_face_landmarks[0]
+
+    legacy_seconds = time_per_frame(run_legacy_analysis, face_analyzer, image_bgr, landmarks, arguments.iterations)
+    vectorized_seconds = time_per_frame(run_vectorized_analysis, face_analyzer, image_bgr, landmarks, arguments.iterations)
+    point_skin_seconds = time_per_frame(run_point_skin_sampling, face_analyzer, image_bgr, landmarks, arguments.iterations)
+    polygon_skin_seconds = time_per_frame(run_polygon_skin_sampling, face_analyzer, image_bgr, landmarks, arguments.iterations)
+
+    print(f"landmarks per face:   {len(landmarks.landmark)}")
+    print("face, nose and feature geometry:")
+    print(f"  list comprehensions:     {legacy_seconds * 1e6:8.1f} us/frame")
+    print(f"  numpy array:             {vectorized_seconds * 1e6:8.1f} us/frame")
+    print(f"  speedup:                 {legacy_seconds / vectorized_seconds:8.2f}x")
+    print(f"  legacy labels:           {describe_labels(run_legacy_analysis(face_analyzer, image_bgr, landmarks))}")
+    print(f"  vectorized labels:       {describe_labels(run_vectorized_analysis(face_analyzer, image_bgr, landmarks))}")
+    print("skin tone sampling (different methods, not a like-for-like comparison):")
+    print(f"  11 landmark points:      {point_skin_seconds * 1e6:8.1f} us/frame  {run_point_skin_sampling(face_analyzer, image_bgr, landmarks)}")
+    skin_tone, skin_tone_confidence = run_polygon_skin_sampling(face_analyzer, image_bgr, landmarks)
+    print(f"  cheek/forehead polygons: {polygon_skin_seconds * 1e6:8.1f} us/frame  {skin_tone} ({skin_tone_confidence:.0%} confidence)")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,285 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+PIPELINE_STAGES = ("capture", "inference", "render", "analysis", "results")
+COMPARED_PERCENTILES = ("p50_ms", "p95_ms")
+NOISE_FLOOR_MS = 0.1
+
+
+class HeadlessWidget:
+    def __init__(self):
+        self.contents = []
+
+    def config(self, **options):
+        pass
+
+    def delete(self, start, end=None):
+        self.contents.clear()
+
+    def insert(self, index, text):
+        self.contents.append(text)
+
+    def set(self, value):
+        pass
+
+    def current(self):
+        return 0
+
+
+class HeadlessWindow:
+    def __init__(self):
+        self.idle_callbacks = []
+
+    def after_idle(self, callback):
+        self.idle_callbacks.append(callback)
+        return len(self.idle_callbacks)
+
+    def run_idle_callbacks(self):
+        idle_callbacks, self.idle_callbacks = self.idle_callbacks, []
+        for callback in idle_callbacks:
+            callback()
+
+
+def create_headless_advisor(camera_pipeline):
+    main.load_tkinter()
+    beauty_advisor = main.BeautyAdvisor.__new__(main.BeautyAdvisor)
+    beauty_advisor.face_analyzer = main.FaceAnalyzer(channel_order="rgb", recommendation_seed=0)
+    beauty_advisor.window = HeadlessWindow()
+    beauty_advisor.camera_pipeline = camera_pipeline
+    beauty_advisor.face_analyses = {}
+    beauty_advisor.selected_face_id = None
+    beauty_advisor.displayed_results = {}
+    beauty_advisor.pending_results_view = None
+    beauty_advisor.results_refresh_job = None
+    for widget_name in ("face_selector", "skin_tone_label", "face_shape_label", "nose_shape_label", "contouring_text",
+                        "highlights_text", "haircut_text", "makeup_text", "glasses_text", "jewelry_text"):
+        setattr(beauty_advisor, widget_name, HeadlessWidget())
+    return beauty_advisor
+
+
+def video_frames(video_path, frame_limit):
+    frame_source = main.FrameSource(video_path)
+    if not frame_source.open():
+        sys.exit(f"Could not open video: {video_path}")
+    try:
+        for frame_id, timestamp, frame in frame_source.frames(reuse_buffer=True):
+            if frame_id >= frame_limit:
+                break
+            yield frame_id, frame
+    finally:
+        frame_source.release()
+
+
+def synthetic_frames(image_path, frame_limit, seed=0):
+    still_image = cv2.imread(image_path)
+    if still_image is None:
+        sys.exit(f"Could not read image: {image_path}")
+    random_generator = np.random.default_rng(seed)
+    height, width = still_image.shape[:2]
+    for frame_id in range(frame_limit):
+        shift_x, shift_y = random_generator.integers(-4, 5, size=2)
+        jitter = np.float32([[1, 0, shift_x], [0, 1, shift_y]])
+        yield frame_id, cv2.warpAffine(still_image, jitter, (width, height), borderMode=cv2.BORDER_REPLICATE)
+
+
+def run_pipeline(source_frames, frame_size, track_landmarks, analyze_every, warmup_frames, overlay_density=None, performance_profile="quality"):
+    camera_pipeline = main.CameraPipeline(None, frame_size, track_landmarks)
+    camera_pipeline.requested_overlay_density = overlay_density
+    camera_pipeline.apply_performance_profile(performance_profile)
+    beauty_advisor = create_headless_advisor(camera_pipeline)
+    frame_pool = camera_pipeline.frame_pool
+    resized_frame = np.empty(frame_pool.frame_shape, dtype=np.uint8)
+    stage_seconds = {stage_name: [] for stage_name in PIPELINE_STAGES}
+    measured_frames = 0
+    faces_found = 0
+
+    frame_iterator = iter(source_frames)
+    measure_start = time.perf_counter()
+    while True:
+        capture_start = time.perf_counter()
+        try:
+            frame_id, source_frame = next(frame_iterator)
+        except StopIteration:
+            break
+        cv2.resize(source_frame, frame_size, dst=resized_frame)
+        frame = frame_pool.acquire()
+        cv2.cvtColor(resized_frame, cv2.COLOR_BGR2RGB, dst=frame)
+        inference_start = time.perf_counter()
+
+        landmark_arrays = camera_pipeline.overlay_landmarks(frame, frame_id)
+        render_start = time.perf_counter()
+
+        display_frame = frame_pool.acquire()
+        np.copyto(display_frame, frame)
+        main.draw_face_landmarks(display_frame, landmark_arrays, camera_pipeline.overlay_density)
+        main.Image.fromarray(display_frame)
+        frame_pool.release(display_frame)
+        render_end = time.perf_counter()
+
+        analysis_seconds = results_seconds = None
+        face_mesh_result = main.landmark_cache.get_face_mesh_result(frame, frame_id)
+        if face_mesh_result.landmark_arrays and frame_id % analyze_every == 0:
+            analysis_start = time.perf_counter()
+            face_analyses = beauty_advisor.face_analyzer.analyze_faces(frame, face_mesh_result.landmark_arrays)
+            results_start = time.perf_counter()
+            beauty_advisor.face_analyses = dict(zip(face_mesh_result.face_ids, face_analyses))
+            beauty_advisor.show_face_analysis(face_mesh_result.face_ids[0])
+            beauty_advisor.window.run_idle_callbacks()
+            results_end = time.perf_counter()
+            analysis_seconds, results_seconds = results_start - analysis_start, results_end - results_start
+        frame_pool.release(frame)
+
+        if frame_id < warmup_frames:
+            measure_start = time.perf_counter()
+            continue
+        measured_frames += 1
+        faces_found += bool(face_mesh_result.landmark_arrays)
+        stage_seconds["capture"].append(inference_start - capture_start)
+        stage_seconds["inference"].append(render_start - inference_start)
+        stage_seconds["render"].append(render_end - render_start)
+        if analysis_seconds is not None:
+            stage_seconds["analysis"].append(analysis_seconds)
+            stage_seconds["results"].append(results_seconds)
+
+    elapsed_seconds = time.perf_counter() - measure_start
+    return stage_seconds, measured_frames, faces_found, elapsed_seconds, camera_pipeline.landmark_tracker
+
+
+def summarize_stage(seconds):
+    if not seconds:
+        return {"samples": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    latencies_ms = np.array(seconds) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {"samples": len(seconds), "p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3),
+            "mean_ms": round(float(latencies_ms.mean()), 3)}
+
+
+def peak_rss_megabytes():
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak_rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def describe_environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "mediapipe": main.load_mediapipe().__version__
+    }
+
+
+def compare_with_baseline(report, baseline, tolerance):
+    regressions = []
+    print(f"\ncompared with baseline from {baseline.get('created', 'unknown time')} (tolerance {tolerance:.0%}):")
+    for stage_name in PIPELINE_STAGES:
+        for percentile in COMPARED_PERCENTILES:
+            current_ms = report["stages"][stage_name][percentile]
+            baseline_ms = baseline["stages"].get(stage_name, {}).get(percentile)
+            if current_ms is None or not baseline_ms:
+                continue
+            change = current_ms / baseline_ms - 1
+            flag = "  REGRESSION" if change > tolerance and current_ms - baseline_ms > NOISE_FLOOR_MS else ""
+            print(f"  {stage_name:<10} {percentile:<7} {baseline_ms:9.2f} -> {current_ms:9.2f} ms  ({change:+.1%}){flag}")
+            if flag:
+                regressions.append(f"{stage_name} {percentile}")
+
+    throughput_change = report["throughput_fps"] / baseline["throughput_fps"] - 1
+    throughput_flag = "  REGRESSION" if throughput_change < -tolerance else ""
+    print(f"  throughput         {baseline['throughput_fps']:9.2f} -> {report['throughput_fps']:9.2f} fps ({throughput_change:+.1%}){throughput_flag}")
+    if throughput_flag:
+        regressions.append("throughput")
+    return regressions
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Capture -> inference -> render -> analysis -> results timings without a camera or display")
+    input_group = parser.add_mutually_exclusive_group(required=True)
+    input_group.add_argument("--video", help="recorded video to feed through the pipeline")
+    input_group.add_argument("--image", help="still photo to turn into jittered synthetic frames")
+    parser.add_argument("--frames", type=int, default=150, help="frames to process, including warm-up (default: 150)")
+    parser.add_argument("--warmup", type=int, default=10, help="frames to run before timing starts (default: 10)")
+    parser.add_argument("--analyze-every", type=int, default=1, help="run the analysis and results stages every Nth frame (default: 1)")
+    parser.add_argument("--track", action="store_true", help="use the landmark tracker like 'main.py --track'")
+    parser.add_argument("--max-faces", type=int, default=1, help="Face Mesh max_num_faces (default: 1)")
+    parser.add_argument("--full-frame", action="store_true", help="disable the face crop like 'main.py --full-frame'")
+    parser.add_argument("--overlay", choices=main.OVERLAY_DENSITIES, help="face mesh overlay detail like 'main.py --overlay' (default: set by --profile)")
+    parser.add_argument("--profile", choices=main.PERFORMANCE_PROFILE_NAMES, default="quality", help="performance profile like 'main.py --profile' (default: quality)")
+    parser.add_argument("--save", help="write the report to this JSON file to use as a baseline")
+    parser.add_argument("--baseline", help="JSON report from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown before a stage counts as a regression (default: 0.15)")
+    arguments = parser.parse_args()
+
+    main.configure_face_mesh(arguments.max_faces)
+    if arguments.full_frame:
+        main.landmark_cache.region_selector = main.RegionOfInterestSelector(full_frame_interval=0)
+    if arguments.video:
+        source_frames = video_frames(arguments.video, arguments.frames)
+    else:
+        source_frames = synthetic_frames(arguments.image, arguments.frames)
+
+    stage_seconds, measured_frames, faces_found, elapsed_seconds, landmark_tracker = run_pipeline(
+        source_frames, main.CAMERA_FRAME_SIZE, arguments.track, arguments.analyze_every, arguments.warmup, arguments.overlay, arguments.profile
+    )
+    if not measured_frames:
+        sys.exit("No frames left to measure after warm-up")
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": describe_environment(),
+        "config": {
+            "input": arguments.video or arguments.image, "synthetic": arguments.video is None,
+            "frames": measured_frames, "warmup": arguments.warmup, "analyze_every": arguments.analyze_every,
+            "track": arguments.track, "max_faces": arguments.max_faces, "full_frame": arguments.full_frame,
+            "profile": arguments.profile, "overlay": arguments.overlay or main.PERFORMANCE_PROFILES[arguments.profile]["overlay_density"]
+        },
+        "stages": {stage_name: summarize_stage(stage_seconds[stage_name]) for stage_name in PIPELINE_STAGES},
+        "throughput_fps": round(measured_frames / elapsed_seconds, 2),
+        "face_detection_rate": round(faces_found / measured_frames, 3),
+        "peak_rss_mb": peak_rss_megabytes()
+    }
+    if landmark_tracker is not None:
+        report["tracker_skip_ratio"] = round(landmark_tracker.skip_ratio, 3)
+
+    print(f"frames measured:      {measured_frames} ({report['face_detection_rate']:.0%} with a face)")
+    print(f"{'stage':<12}{'samples':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage_name in PIPELINE_STAGES:
+        stage_summary = report["stages"][stage_name]
+        if stage_summary["samples"]:
+            print(f"{stage_name:<12}{stage_summary['samples']:>8}{stage_summary['p50_ms']:>10.2f}"
+                  f"{stage_summary['p95_ms']:>10.2f}{stage_summary['p99_ms']:>10.2f}")
+    print(f"throughput:           {report['throughput_fps']:.1f} frames/s")
+    print(f"peak RSS:             {report['peak_rss_mb']:.1f} MB")
+    if landmark_tracker is not None:
+        print(f"tracker skipped:      {report['tracker_skip_ratio']:.0%} of Face Mesh runs")
+
+    if arguments.save:
+        with open(arguments.save, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"saved report to {arguments.save}")
+
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("config") != report["config"]:
+            print("warning: baseline was recorded with different settings", file=sys.stderr)
+        regressions = compare_with_baseline(report, baseline, arguments.tolerance)
+        if regressions:
+            sys.exit("Regressions: " + ", ".join(regressions))
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "mediapipe_loaded": "mediapipe" in sys.modules,
+    "tkinter_loaded": "tkinter" in sys.modules
+}))
+"""
+
+MODEL_PROBE = """
+import json, time
+start = time.perf_counter()
+import main
+main.warm_up_face_mesh()
+print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+WINDOW_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+application_window = main.load_tkinter().Tk()
+beauty_app = main.BeautyAdvisor(application_window, sys.argv[1])
+application_window.update()
+window_seconds = time.perf_counter() - start
+while beauty_app.camera_startup is None:
+    application_window.update()
+    time.sleep(0.005)
+camera_seconds = time.perf_counter() - start
+beauty_app.close_application()
+print(json.dumps({"seconds": window_seconds, "camera_ready_seconds": camera_seconds}))
+"""
+
+
+def run_probe(probe_source, *probe_arguments):
+    start_time = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", probe_source, *probe_arguments],
+        cwd=PACKAGE_DIRECTORY, capture_output=True, text=True, check=True
+    )
+    process_seconds = time.perf_counter() - start_time
+    probe_result = json.loads(completed.stdout.strip().splitlines()[-1])
+    probe_result["process_seconds"] = process_seconds
+    return probe_result
+
+
+def run_help():
+    start_time = time.perf_counter()
+    subprocess.run([sys.executable, "main.py", "--help"], cwd=PACKAGE_DIRECTORY, capture_output=True, check=True)
+    return {"process_seconds": time.perf_counter() - start_time}
+
+
+def describe_timings(name, probe_results, field):
+    timings_ms = np.array([probe_result[field] for probe_result in probe_results]) * 1000
+    print(f"{name:<28}{np.median(timings_ms):>10.1f}{timings_ms.min():>10.1f}{timings_ms.max():>10.1f}")
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description="Cold-start timings for importing main.py, the CLI and the GUI")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreter runs per measurement (default: 5)")
+    parser.add_argument("--source", default="0", help="camera index or video file for the window measurement (default: 0)")
+    parser.add_argument("--skip-window", action="store_true", help="skip the window measurement even when a display is available")
+    arguments = parser.parse_args()
+
+    import_results = [run_probe(IMPORT_PROBE) for _ in range(arguments.repeat)]
+    help_results = [run_help() for _ in range(arguments.repeat)]
+    model_results = [run_probe(MODEL_PROBE) for _ in range(arguments.repeat)]
+    window_results = []
+    if arguments.skip_window:
+        pass
+    elif not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        print("no DISPLAY set, skipping the window measurement", file=sys.stderr)
+    else:
+        window_results = [run_probe(WINDOW_PROBE, arguments.source) for _ in range(arguments.repeat)]
+
+    print(f"{'measurement':<28}{'median ms':>10}{'min ms':>10}{'max ms':>10}")
+    describe_timings("import main", import_results, "seconds")
+    describe_timings("  whole process", import_results, "process_seconds")
+    describe_timings("main.py --help", help_results, "process_seconds")
+    describe_timings("first Face Mesh result", model_results, "seconds")
+    if window_results:
+        describe_timings("window shown", window_results, "seconds")
+        describe_timings("camera and model ready", window_results, "camera_ready_seconds")
+
+    eager_imports = [
+        module_name for module_name in ("mediapipe", "tkinter")
+        if any(import_result[f"{module_name}_loaded"] for import_result in import_results)
+    ]
+    if eager_imports:
+        sys.exit("'import main' loaded " + ", ".join(eager_imports))
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -1,25 +1,1606 @@
+import argparse
+import asyncio
+import contextlib
 import cv2
-import mediapipe as mp
+import hashlib
+import importlib.metadata
+import inspect
+import json
+import multiprocessing
 import numpy as np
+import os
 import random
+import sqlite3
+import sys
+import threading
 import time
-import tkinter as tk
-from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
-
-face_mesh_model = mp.solutions.face_mesh.FaceMesh(
-    static_image_mode=False,
-    max_num_faces=1,
-    refine_landmarks=True,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from PIL import Image
+
+CAMERA_FRAME_SIZE = (640, 480)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+SKIN_SAMPLING_REGIONS = (
+    ("left cheek", [117, 118, 101, 36, 205, 187, 123]),
+    ("right cheek", [346, 347, 330, 266, 425, 411, 352]),
+    ("forehead", [108, 109, 10, 338, 337, 336, 9, 107])
 )
+RECOMMENDATION_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recommendations.json")
+PERFORMANCE_PROFILES = {
+    "quality": {"refine_landmarks": True, "inference_scale": 1.0, "overlay_density": "full", "poll_interval_ms": 15},
+    "balanced": {"refine_landmarks": False, "inference_scale": 0.75, "overlay_density": "contours", "poll_interval_ms": 20},
+    "low-power": {"refine_landmarks": False, "inference_scale": 0.5, "overlay_density": "minimal", "poll_interval_ms": 30}
+}
+PERFORMANCE_PROFILE_NAMES = tuple(PERFORMANCE_PROFILES)
+IDLE_POLL_INTERVAL_MS = 100
+
+mp = None
+landmark_pb2 = None
+mediapipe_lock = threading.Lock()
+
+tk = ttk = messagebox = ImageTk = None
+
+def load_mediapipe():
+    global mp, landmark_pb2
+    if mp is None:
+        with mediapipe_lock:
+            if mp is None:
+                import mediapipe
+                from mediapipe.framework.formats import landmark_pb2 as landmark_protos
+                landmark_pb2 = landmark_protos
+                mp = mediapipe
+    return mp
+
+def load_tkinter():
+    global tk, ttk, messagebox, ImageTk
+    if tk is None:
+        import tkinter
+        from tkinter import ttk as themed_widgets, messagebox as message_dialogs
+        from PIL import ImageTk as image_widgets
+        ttk, messagebox, ImageTk = themed_widgets, message_dialogs, image_widgets
+        tk = tkinter
+    return tk
+
+def create_face_mesh_model(static_image_mode=False, max_num_faces=1, refine_landmarks=True):
+    return load_mediapipe().solutions.face_mesh.FaceMesh(
+        static_image_mode=static_image_mode,
+        max_num_faces=max_num_faces,
+        refine_landmarks=refine_landmarks,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+face_mesh_model = None
+face_mesh_max_faces = 1
+face_mesh_refine_landmarks = True
+face_mesh_lock = threading.Lock()
+
+def detect_face_landmarks(image):
+    global face_mesh_model
+    with face_mesh_lock:
+        if face_mesh_model is None:
+            face_mesh_model = create_face_mesh_model(max_num_faces=face_mesh_max_faces, refine_landmarks=face_mesh_refine_landmarks)
+        return face_mesh_model.process(image)
+
+def warm_up_face_mesh(frame_size=CAMERA_FRAME_SIZE):
+    detect_face_landmarks(np.zeros((frame_size[1], frame_size[0], 3), dtype=np.uint8))
+
+def configure_face_mesh(max_num_faces, refine_landmarks=True):
+    global face_mesh_model, face_mesh_max_faces, face_mesh_refine_landmarks
+    with face_mesh_lock:
+        if face_mesh_model is not None and (max_num_faces, refine_landmarks) != (face_mesh_max_faces, face_mesh_refine_landmarks):
+            face_mesh_model.close()
+            face_mesh_model = None
+        face_mesh_max_faces = max_num_faces
+        face_mesh_refine_landmarks = refine_landmarks
+
+def landmarks_to_array(face_landmarks, image_dimensions):
+    height, width = image_dimensions[:2]
+    landmark_points = np.array([(landmark.x, landmark.y, landmark.z) for landmark in face_landmarks.landmark], dtype=np.float32)
+    landmark_points *= np.array([width, height, width], dtype=np.float32)
+    return landmark_points
+
+def array_to_landmarks(landmark_points, image_dimensions):
+    height, width = image_dimensions[:2]
+    normalized_points = landmark_points / np.array([width, height, width], dtype=np.float32)
+    load_mediapipe()
+    return landmark_pb2.NormalizedLandmarkList(landmark=[
+        landmark_pb2.NormalizedLandmark(x=x_pos, y=y_pos, z=z_pos) for x_pos, y_pos, z_pos in normalized_points.tolist()
+    ])
+
+def masked_median(values, valid):
+    if values.dtype.kind != "f":
+        values = values.astype(np.float64)
+    valid_counts = valid.sum(axis=-1)
+    sorted_values = np.sort(np.where(valid, values, np.array(np.inf, dtype=values.dtype)), axis=-1)
+    lower_middle = np.take_along_axis(sorted_values, np.maximum(valid_counts - 1, 0)[..., np.newaxis] // 2, axis=-1)
+    upper_middle = np.take_along_axis(sorted_values, np.minimum(valid_counts // 2, values.shape[-1] - 1)[..., np.newaxis], axis=-1)
+    return np.mean(np.concatenate([lower_middle, upper_middle], axis=-1), axis=-1)
+
+def landmark_rows(landmark_points, landmark_indices):
+    return np.moveaxis(landmark_points[..., landmark_indices, :], -2, 0)
+
+class FaceMeshResult:
+    def __init__(self, multi_face_landmarks, image_dimensions, landmark_arrays=None):
+        self._multi_face_landmarks = multi_face_landmarks
+        self.image_dimensions = image_dimensions[:2]
+        self._landmark_arrays = landmark_arrays
+        self.track_ids = None
+
+    @property
+    def multi_face_landmarks(self):
+        if self._multi_face_landmarks is None and self._landmark_arrays:
+            self._multi_face_landmarks = [
+                array_to_landmarks(landmark_points, self.image_dimensions)
+                for landmark_points in self._landmark_arrays
+            ]
+        return self._multi_face_landmarks
+
+    @property
+    def landmark_arrays(self):
+        if self._landmark_arrays is None:
+            self._landmark_arrays = [
+                landmarks_to_array(face_landmarks, self.image_dimensions)
+                for face_landmarks in self.multi_face_landmarks or []
+            ]
+        return self._landmark_arrays
+
+    @property
+    def face_ids(self):
+        if self.track_ids is not None:
+            return self.track_ids
+        return list(range(1, len(self.landmark_arrays) + 1))
+
+class FaceTrackMatcher:
+    def __init__(self, max_distance=0.6, max_missed_frames=15):
+        self.max_distance = max_distance
+        self.max_missed_frames = max_missed_frames
+        self.track_centroids = {}
+        self.missed_frames = {}
+        self.next_track_id = 1
+        self.lock = threading.Lock()
+
+    def assign(self, landmark_arrays):
+        with self.lock:
+            face_track_ids = [None] * len(landmark_arrays)
+            known_track_ids = list(self.track_centroids)
+            if landmark_arrays:
+                face_points = np.stack([landmark_points[:, :2] for landmark_points in landmark_arrays])
+                face_centroids = face_points.mean(axis=1)
+                face_sizes = np.ptp(face_points, axis=1).max(axis=1)
+            
+            if landmark_arrays and known_track_ids:
+                track_centroids = np.array([self.track_centroids[track_id] for track_id in known_track_ids])
+                centroid_distances = np.linalg.norm(face_centroids[:, None] - track_centroids[None], axis=2) / np.maximum(face_sizes[:, None], 1)
+                matched_tracks = set()
+                for face_index, track_index in zip(*np.unravel_index(np.argsort(centroid_distances, axis=None), centroid_distances.shape)):
+                    if centroid_distances[face_index, track_index] > self.max_distance:
+                        break
+                    if face_track_ids[face_index] is None and track_index not in matched_tracks:
+                        face_track_ids[face_index] = known_track_ids[track_index]
+                        matched_tracks.add(track_index)
+            
+            for face_index, track_id in enumerate(face_track_ids):
+                if track_id is None:
+                    track_id = face_track_ids[face_index] = self.next_track_id
+                    self.next_track_id += 1
+                self.track_centroids[track_id] = face_centroids[face_index]
+                self.missed_frames[track_id] = 0
+            
+            for track_id in known_track_ids:
+                if track_id not in face_track_ids:
+                    self.missed_frames[track_id] += 1
+                    if self.missed_frames[track_id] > self.max_missed_frames:
+                        del self.track_centroids[track_id], self.missed_frames[track_id]
+            return face_track_ids
+
+    def label(self, face_mesh_result):
+        if face_mesh_result.track_ids is None:
+            face_mesh_result.track_ids = self.assign(face_mesh_result.landmark_arrays)
+        return face_mesh_result
+
+class RegionOfInterestSelector:
+    def __init__(self, padding=0.4, target_face_size=192, pyramid_levels=3, full_frame_interval=60, inference_scale=1.0):
+        self.padding = padding
+        self.target_face_size = target_face_size
+        self.pyramid_levels = pyramid_levels
+        self.full_frame_interval = full_frame_interval
+        self.inference_scale = inference_scale
+        self.previous_face_box = None
+        self.current_region = None
+        self.region_buffer = None
+        self.lock = threading.RLock()
+        self.frames_since_full_frame = 0
+        self.pixels_processed = 0
+        self.full_frame_pixels = 0
+
+    @property
+    def pixel_reduction(self):
+        return self.full_frame_pixels / self.pixels_processed if self.pixels_processed else 1.0
+
+    def set_inference_scale(self, inference_scale):
+        with self.lock:
+            self.inference_scale = inference_scale
+            self.previous_face_box = self.current_region = None
+
+    def region_still_fits(self, face_box, face_size):
+        (region_left, region_top, region_right, region_bottom), scale, region_face_size = self.current_region
+        left, top, right, bottom = face_box
+        margin = 0.25 * face_size * self.padding
+        return (
+            left - margin >= region_left and top - margin >= region_top and
+            right + margin <= region_right and bottom + margin <= region_bottom and
+            0.8 <= face_size / region_face_size <= 1.25
+        )
+
+    def select_region(self, frame):
+        height, width = frame.shape[:2]
+        if self.previous_face_box is None or self.frames_since_full_frame >= self.full_frame_interval:
+            self.current_region = None
+            return (0, 0, width, height), self.inference_scale
+        
+        left, top, right, bottom = self.previous_face_box
+        face_size = max(right - left, bottom - top)
+        if self.current_region is not None and self.region_still_fits(self.previous_face_box, face_size):
+            return self.current_region[:2]
+        
+        half_size = face_size * (0.5 + self.padding)
+        center_x, center_y = (left + right) / 2, (top + bottom) / 2
+        region = (
+            max(0, int(center_x - half_size)), max(0, int(center_y - half_size)),
+            min(width, int(center_x + half_size)), min(height, int(center_y + half_size))
+        )
+        
+        pyramid_level = 0
+        while pyramid_level + 1 < self.pyramid_levels and face_size / 2 ** (pyramid_level + 1) >= self.target_face_size:
+            pyramid_level += 1
+        self.current_region = (region, self.inference_scale / 2 ** pyramid_level, face_size)
+        return self.current_region[:2]
+
+    def prepare_region_image(self, frame, region, scale):
+        left, top, right, bottom = region
+        if region == (0, 0, frame.shape[1], frame.shape[0]) and scale == 1.0 and frame.flags.c_contiguous:
+            return frame
+        
+        region_shape = (max(1, int((bottom - top) * scale)), max(1, int((right - left) * scale)), frame.shape[2])
+        if self.region_buffer is None or self.region_buffer.shape != region_shape:
+            self.region_buffer = np.empty(region_shape, dtype=frame.dtype)
+        cv2.resize(frame[top:bottom, left:right], region_shape[1::-1], dst=self.region_buffer, interpolation=cv2.INTER_AREA)
+        return self.region_buffer
+
+    def detect(self, frame, detect_region):
+        with self.lock:
+            return self.detect_in_region(frame, detect_region)
+
+    def detect_in_region(self, frame, detect_region):
+        previous_region = self.current_region
+        region, scale = self.select_region(frame)
+        left, top, right, bottom = region
+        full_frame = region == (0, 0, frame.shape[1], frame.shape[0])
+        
+        region_image = self.prepare_region_image(frame, region, scale)
+        scale = region_image.shape[1] / (right - left)
+        self.pixels_processed += region_image.shape[0] * region_image.shape[1]
+        self.full_frame_pixels += frame.shape[0] * frame.shape[1]
+        
+        multi_face_landmarks = detect_region(region_image)
+        if not multi_face_landmarks and not full_frame and self.current_region is not previous_region:
+            multi_face_landmarks = detect_region(region_image)
+        if not multi_face_landmarks and not full_frame:
+            self.previous_face_box = self.current_region = None
+            return self.detect_in_region(frame, detect_region)
+        
+        self.frames_since_full_frame = 0 if full_frame else self.frames_since_full_frame + 1
+        landmark_arrays = []
+        for face_landmarks in multi_face_landmarks or []:
+            landmark_points = landmarks_to_array(face_landmarks, region_image.shape)
+            landmark_points /= scale
+            landmark_points[:, 0] += left
+            landmark_points[:, 1] += top
+            landmark_arrays.append(landmark_points)
+        
+        if landmark_arrays:
+            all_points = np.concatenate([landmark_points[:, :2] for landmark_points in landmark_arrays])
+            self.previous_face_box = (*all_points.min(axis=0), *all_points.max(axis=0))
+        else:
+            self.previous_face_box = None
+        
+        if full_frame:
+            return FaceMeshResult(multi_face_landmarks, frame.shape, landmark_arrays)
+        return FaceMeshResult(None, frame.shape, landmark_arrays)
+
+class LandmarkResultCache:
+    def __init__(self, capacity=32, region_selector=None, face_tracks=None):
+        self.capacity = capacity
+        self.region_selector = region_selector
+        self.face_tracks = face_tracks
+        self.cached_results = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def frame_key(self, frame, frame_id=None):
+        if frame_id is not None:
+            return ("frame", frame_id)
+        frame_digest = hashlib.blake2b(np.ascontiguousarray(frame).data, digest_size=16).hexdigest()
+        return ("content", frame.shape, frame_digest)
+
+    def get_face_landmarks(self, frame, frame_id=None):
+        return self.get_face_mesh_result(frame, frame_id).multi_face_landmarks
+
+    def cached_face_mesh_result(self, frame, frame_id=None):
+        with self.lock:
+            return self.cached_results.get(self.frame_key(frame, frame_id))
+
+    def store_result(self, frame_id, face_mesh_result):
+        if self.face_tracks is not None:
+            self.face_tracks.label(face_mesh_result)
+        with self.lock:
+            self.cached_results[("frame", frame_id)] = face_mesh_result
+            while len(self.cached_results) > self.capacity:
+                self.cached_results.popitem(last=False)
+
+    def get_face_mesh_result(self, frame, frame_id=None):
+        cache_key = self.frame_key(frame, frame_id)
+        with self.lock:
+            if cache_key in self.cached_results:
+                self.cached_results.move_to_end(cache_key)
+                self.hits += 1
+                return self.cached_results[cache_key]
+        
+        if self.region_selector is None:
+            face_mesh_result = FaceMeshResult(detect_face_landmarks(frame).multi_face_landmarks, frame.shape)
+        else:
+            face_mesh_result = self.region_selector.detect(
+                frame, lambda region_image: detect_face_landmarks(region_image).multi_face_landmarks
+            )
+        if self.face_tracks is not None:
+            self.face_tracks.label(face_mesh_result)
+        
+        with self.lock:
+            self.misses += 1
+            self.cached_results[cache_key] = face_mesh_result
+            while len(self.cached_results) > self.capacity:
+                self.cached_results.popitem(last=False)
+        return face_mesh_result
+
+landmark_cache = LandmarkResultCache(region_selector=RegionOfInterestSelector(), face_tracks=FaceTrackMatcher())
+
+class LandmarkTracker:
+    def __init__(self, detect_landmarks, motion_threshold=6.0, keyframe_interval=15, smoothing=0.6):
+        self.detect_landmarks = detect_landmarks
+        self.motion_threshold = motion_threshold
+        self.keyframe_interval = keyframe_interval
+        self.smoothing = smoothing
+        self.keyframe_result = None
+        self.reference_region = None
+        self.reference_patch = None
+        self.smoothed_arrays = None
+        self.frames_since_keyframe = 0
+        self.inferences_run = 0
+        self.inferences_skipped = 0
+
+    @property
+    def skip_ratio(self):
+        tracked_frames = self.inferences_run + self.inferences_skipped
+        return self.inferences_skipped / tracked_frames if tracked_frames else 0.0
+
+    def motion_region(self, frame, landmark_arrays):
+        all_points = np.concatenate([landmark_points[:, :2] for landmark_points in landmark_arrays])
+        (left, top), (right, bottom) = all_points.min(axis=0), all_points.max(axis=0)
+        padding_x, padding_y = 0.1 * (right - left), 0.1 * (bottom - top)
+        height, width = frame.shape[:2]
+        left, top = max(0, int(left - padding_x)), max(0, int(top - padding_y))
+        right, bottom = min(width, int(right + padding_x)), min(height, int(bottom + padding_y))
+        if right - left < 8 or bottom - top < 8:
+            return None
+        return left, top, right, bottom
+
+    def motion_patch(self, frame, region):
+        left, top, right, bottom = region
+        grayscale_region = cv2.cvtColor(frame[top:bottom, left:right], cv2.COLOR_RGB2GRAY)
+        return cv2.resize(grayscale_region, (32, 32), interpolation=cv2.INTER_AREA)
+
+    def needs_inference(self, frame):
+        if self.reference_patch is None or self.frames_since_keyframe + 1 >= self.keyframe_interval:
+            return True
+        motion_energy = cv2.absdiff(self.motion_patch(frame, self.reference_region), self.reference_patch).mean()
+        return motion_energy > self.motion_threshold
+
+    def smooth_landmarks(self, landmark_arrays, face_ids):
+        previous_arrays = self.smoothed_arrays or {}
+        self.smoothed_arrays = {}
+        for face_id, landmark_points in zip(face_ids, landmark_arrays):
+            previous_points = previous_arrays.get(face_id)
+            if previous_points is None or previous_points.shape != landmark_points.shape:
+                self.smoothed_arrays[face_id] = landmark_points
+            else:
+                self.smoothed_arrays[face_id] = self.smoothing * landmark_points + (1 - self.smoothing) * previous_points
+        return list(self.smoothed_arrays.values())
+
+    def track(self, frame, frame_id=None):
+        if self.needs_inference(frame):
+            face_mesh_result = self.detect_landmarks(frame, frame_id)
+            self.keyframe_result = face_mesh_result
+            self.frames_since_keyframe = 0
+            self.inferences_run += 1
+            
+            self.reference_region = self.reference_patch = None
+            if face_mesh_result.landmark_arrays:
+                self.reference_region = self.motion_region(frame, face_mesh_result.landmark_arrays)
+            if self.reference_region is not None:
+                self.reference_patch = self.motion_patch(frame, self.reference_region)
+        else:
+            face_mesh_result = self.keyframe_result
+            self.frames_since_keyframe += 1
+            self.inferences_skipped += 1
+        
+        smoothed_result = FaceMeshResult(None, frame.shape, self.smooth_landmarks(face_mesh_result.landmark_arrays, face_mesh_result.face_ids))
+        smoothed_result.track_ids = face_mesh_result.track_ids
+        return face_mesh_result, smoothed_result
+
+def measure_frame_sharpness(frame):
+    grayscale_frame = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    return cv2.Laplacian(grayscale_frame, cv2.CV_64F).var()
+
+def select_best_capture_frame(burst_frames, is_frame_rejected=lambda frame_id: False):
+    ranked_frames = sorted(
+        burst_frames, key=lambda burst_frame: (not is_frame_rejected(burst_frame[0]), measure_frame_sharpness(burst_frame[1])), reverse=True
+    )
+    for frame_id, frame in ranked_frames:
+        if not is_frame_rejected(frame_id) and landmark_cache.get_face_landmarks(frame, frame_id):
+            return frame_id, frame
+    return ranked_frames[0]
+
+FRAME_GATE_FEEDBACK = {
+    "too_dark": "Too dark - turn on a light or face a window",
+    "too_bright": "Too bright - move away from direct light",
+    "blurry": "Too blurry - hold still",
+    "no_face": "No face found - look straight at the camera"
+}
+
+class FrameQualityGate:
+    def __init__(self, channel_order="rgb", face_cascade_path=None, gate_size=(160, 120), min_sharpness=100.0,
+                 dark_fraction_limit=0.6, bright_fraction_limit=0.4):
+        self.grayscale_conversion = cv2.COLOR_RGB2GRAY if channel_order == "rgb" else cv2.COLOR_BGR2GRAY
+        self.gate_size = gate_size
+        self.min_sharpness = min_sharpness
+        self.dark_fraction_limit = dark_fraction_limit
+        self.bright_fraction_limit = bright_fraction_limit
+        self.face_detector = self.load_face_detector(face_cascade_path)
+        self.gate_color_frame = np.empty((gate_size[1], gate_size[0], 3), dtype=np.uint8)
+        self.gate_frame = np.empty((gate_size[1], gate_size[0]), dtype=np.uint8)
+        self.frames_checked = 0
+        self.rejections = Counter()
+        self.lock = threading.Lock()
+
+    def load_face_detector(self, face_cascade_path):
+        if face_cascade_path is None and hasattr(cv2, "data"):
+            face_cascade_path = os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+        if face_cascade_path is None or not os.path.exists(face_cascade_path):
+            return None
+        face_detector = cv2.CascadeClassifier(face_cascade_path)
+        return None if face_detector.empty() else face_detector
+
+    def check(self, frame):
+        with self.lock:
+            rejection = self.find_rejection(frame)
+            self.frames_checked += 1
+            if rejection is not None:
+                self.rejections[rejection] += 1
+        return rejection
+
+    def find_rejection(self, frame):
+        cv2.resize(frame, self.gate_size, dst=self.gate_color_frame, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.gate_color_frame, self.grayscale_conversion, dst=self.gate_frame)
+        
+        brightness_histogram = cv2.calcHist([self.gate_frame], [0], None, [256], [0, 256]).ravel() / self.gate_frame.size
+        if brightness_histogram[:40].sum() > self.dark_fraction_limit:
+            return "too_dark"
+        if brightness_histogram[216:].sum() > self.bright_fraction_limit:
+            return "too_bright"
+        if cv2.Laplacian(self.gate_frame, cv2.CV_64F).var() < self.min_sharpness:
+            return "blurry"
+        if self.face_detector is not None and not len(self.face_detector.detectMultiScale(self.gate_frame, 1.15, 3, minSize=(20, 20))):
+            return "no_face"
+        return None
+
+    @property
+    def reject_rate(self):
+        return sum(self.rejections.values()) / self.frames_checked if self.frames_checked else 0.0
+
+    def describe_rejections(self):
+        rejection_rates = [f"{rejection} {count / self.frames_checked:.0%}" for rejection, count in self.rejections.most_common()]
+        return f"{self.reject_rate:.0%} of {self.frames_checked} frames rejected" + (f" ({', '.join(rejection_rates)})" if rejection_rates else "")
+
+OVERLAY_DENSITIES = ("full", "contours", "minimal")
+
+face_mesh_overlay_groups = {}
+
+def face_mesh_overlay_styles(density="full"):
+    if density not in face_mesh_overlay_groups:
+        face_mesh_solution = load_mediapipe().solutions.face_mesh
+        drawing_styles = mp.solutions.drawing_styles
+        styled_connections = []
+        if density == "full":
+            tesselation_style = drawing_styles.get_default_face_mesh_tesselation_style()
+            styled_connections.extend((connection, tesselation_style) for connection in sorted(face_mesh_solution.FACEMESH_TESSELATION))
+        contour_styles = drawing_styles.get_default_face_mesh_contours_style()
+        if density == "minimal":
+            minimal_connections = (face_mesh_solution.FACEMESH_FACE_OVAL | face_mesh_solution.FACEMESH_LIPS
+                                   | face_mesh_solution.FACEMESH_LEFT_EYE | face_mesh_solution.FACEMESH_RIGHT_EYE)
+            contour_styles = {connection: style for connection, style in contour_styles.items() if connection in minimal_connections}
+        styled_connections.extend(contour_styles.items())
+        
+        style_groups = {}
+        for connection, drawing_spec in styled_connections:
+            style_groups.setdefault((drawing_spec.color, drawing_spec.thickness), []).append(connection)
+        face_mesh_overlay_groups[density] = [
+            (np.array(connections, dtype=np.int32), color, thickness) for (color, thickness), connections in style_groups.items()
+        ]
+    return face_mesh_overlay_groups[density]
+
+def draw_face_landmarks(image, landmark_arrays, density="full"):
+    if landmark_arrays:
+        height, width = image.shape[:2]
+        landmark_points = np.stack(landmark_arrays)[..., :2]
+        landmark_visible = ((landmark_points >= 0) & (landmark_points <= (width, height))).all(axis=-1)
+        pixel_points = np.minimum(np.floor(landmark_points), (width - 1, height - 1)).astype(np.int32)
+        
+        for connections, color, thickness in face_mesh_overlay_styles(density):
+            segments_visible = landmark_visible[:, connections].all(axis=-1)
+            cv2.polylines(image, pixel_points[:, connections][segments_visible], False, color, thickness)
+    
+    return image
+
+class LatencyHistogram:
+    def __init__(self, capacity=512):
+        self.samples = np.zeros(capacity, dtype=np.float64)
+        self.next_index = 0
+        self.count = 0
+        self.total_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples[self.next_index] = seconds
+            self.next_index = (self.next_index + 1) % len(self.samples)
+            self.count += 1
+            self.total_seconds += seconds
+
+    def quantiles(self, quantile_levels=(0.5, 0.95, 0.99)):
+        with self.lock:
+            recent_samples = self.samples[:min(self.count, len(self.samples))].copy()
+        if not len(recent_samples):
+            return [0.0] * len(quantile_levels)
+        return np.quantile(recent_samples, quantile_levels).tolist()
+
+class TimingSpan:
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start_time = 0.0
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.histogram.record(time.perf_counter() - self.start_time)
+        return False
+
+class PerformanceMonitor:
+    def __init__(self, enabled=False, histogram_capacity=512):
+        self.enabled = enabled
+        self.histogram_capacity = histogram_capacity
+        self.stage_histograms = {}
+        self.frame_times = deque(maxlen=120)
+        self.frame_start_times = {}
+        self.lock = threading.Lock()
+        self.hud_text = ()
+        self.hud_updated_at = 0.0
+        self.metrics_thread = None
+        self.frame_gate = None
+        self.idle_scheduler = None
+
+    def histogram(self, stage_name):
+        stage_histogram = self.stage_histograms.get(stage_name)
+        if stage_histogram is None:
+            with self.lock:
+                stage_histogram = self.stage_histograms.setdefault(stage_name, LatencyHistogram(self.histogram_capacity))
+        return stage_histogram
+
+    def span(self, stage_name):
+        if not self.enabled:
+            return NULL_TIMING_SPAN
+        return TimingSpan(self.histogram(stage_name))
+
+    def record(self, stage_name, seconds):
+        if self.enabled:
+            self.histogram(stage_name).record(seconds)
+
+    def frame_started(self, frame_id):
+        if self.enabled:
+            self.frame_start_times[frame_id % 64] = (frame_id, time.perf_counter())
+
+    def frame_displayed(self, frame_id):
+        if not self.enabled:
+            return
+        displayed_at = time.perf_counter()
+        self.frame_times.append(displayed_at)
+        started_frame_id, started_at = self.frame_start_times.get(frame_id % 64, (None, 0.0))
+        if started_frame_id == frame_id:
+            self.histogram("frame_latency").record(displayed_at - started_at)
+
+    @property
+    def frames_per_second(self):
+        if len(self.frame_times) < 2:
+            return 0.0
+        return (len(self.frame_times) - 1) / (self.frame_times[-1] - self.frame_times[0])
+
+    def heads_up_display(self):
+        now = time.perf_counter()
+        if now - self.hud_updated_at >= 0.5:
+            stage_medians = [
+                f"{stage_name} {self.histogram(stage_name).quantiles((0.5,))[0] * 1000:.0f}"
+                for stage_name in ("camera_read", "face_mesh", "image_convert", "display_update")
+                if stage_name in self.stage_histograms
+            ]
+            frame_latency_p50, frame_latency_p95 = self.histogram("frame_latency").quantiles((0.5, 0.95))
+            gate_text = f"  gate rejects {self.frame_gate.reject_rate:.0%}" if self.frame_gate is not None else ""
+            self.hud_text = (
+                f"{self.frames_per_second:.1f} fps  latency p50 {frame_latency_p50 * 1000:.0f} / p95 {frame_latency_p95 * 1000:.0f} ms{gate_text}",
+                "p50 ms: " + "  ".join(stage_medians)
+            )
+            self.hud_updated_at = now
+        return self.hud_text
+
+    def prometheus_text(self):
+        metric_lines = [
+            "# HELP beauty_advisor_stage_seconds Time spent in each stage of the live pipeline.",
+            "# TYPE beauty_advisor_stage_seconds summary"
+        ]
+        for stage_name, stage_histogram in sorted(self.stage_histograms.items()):
+            for quantile_level, quantile_seconds in zip((0.5, 0.95, 0.99), stage_histogram.quantiles()):
+                metric_lines.append(f'beauty_advisor_stage_seconds{{stage="{stage_name}",quantile="{quantile_level}"}} {quantile_seconds:.6f}')
+            metric_lines.append(f'beauty_advisor_stage_seconds_sum{{stage="{stage_name}"}} {stage_histogram.total_seconds:.6f}')
+            metric_lines.append(f'beauty_advisor_stage_seconds_count{{stage="{stage_name}"}} {stage_histogram.count}')
+        metric_lines.extend([
+            "# HELP beauty_advisor_frames_per_second Frames shown per second over the last few seconds.",
+            "# TYPE beauty_advisor_frames_per_second gauge",
+            f"beauty_advisor_frames_per_second {self.frames_per_second:.2f}"
+        ])
+        if self.frame_gate is not None:
+            metric_lines.extend([
+                "# HELP beauty_advisor_gate_frames_total Frames checked by the quality gate, by outcome.",
+                "# TYPE beauty_advisor_gate_frames_total counter",
+                f'beauty_advisor_gate_frames_total{{result="passed"}} {self.frame_gate.frames_checked - sum(self.frame_gate.rejections.values())}'
+            ])
+            for rejection in FRAME_GATE_FEEDBACK:
+                metric_lines.append(f'beauty_advisor_gate_frames_total{{result="{rejection}"}} {self.frame_gate.rejections[rejection]}')
+            metric_lines.extend([
+                "# HELP beauty_advisor_gate_reject_ratio Share of checked frames the quality gate rejected.",
+                "# TYPE beauty_advisor_gate_reject_ratio gauge",
+                f"beauty_advisor_gate_reject_ratio {self.frame_gate.reject_rate:.4f}"
+            ])
+        if self.idle_scheduler is not None:
+            cpu_seconds_saved = self.idle_scheduler.cpu_seconds_saved_per_hour()
+            metric_lines.extend([
+                "# HELP beauty_advisor_scheduler_seconds_total Seconds the live view spent at full rate, throttled while idle or paused while minimized.",
+                "# TYPE beauty_advisor_scheduler_seconds_total counter"
+            ])
+            for state, state_seconds in sorted(self.idle_scheduler.state_seconds.items()):
+                metric_lines.append(f'beauty_advisor_scheduler_seconds_total{{state="{state}"}} {state_seconds:.3f}')
+            metric_lines.extend([
+                "# HELP beauty_advisor_cpu_seconds_saved_per_hour Estimated CPU seconds per hour saved by throttling compared with running at full rate.",
+                "# TYPE beauty_advisor_cpu_seconds_saved_per_hour gauge",
+                f"beauty_advisor_cpu_seconds_saved_per_hour {cpu_seconds_saved:.1f}"
+            ])
+        return "\n".join(metric_lines) + "\n"
+
+    def write_metrics_file(self, metrics_path):
+        temporary_path = metrics_path + ".tmp"
+        with open(temporary_path, "w") as metrics_file:
+            metrics_file.write(self.prometheus_text())
+        os.replace(temporary_path, metrics_path)
+
+    def start_metrics_dump(self, metrics_path, interval_seconds=10.0):
+        def dump_metrics():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.write_metrics_file(metrics_path)
+                except OSError as error:
+                    print(f"Could not write metrics to {metrics_path}: {error}", file=sys.stderr)
+        
+        self.metrics_thread = threading.Thread(target=dump_metrics, name="metrics-dump", daemon=True)
+        self.metrics_thread.start()
+
+NULL_TIMING_SPAN = contextlib.nullcontext()
+performance_monitor = PerformanceMonitor()
+
+class LatestFrameQueue:
+    def __init__(self, on_drop=None):
+        self.condition = threading.Condition()
+        self.latest_item = None
+        self.dropped_items = 0
+        self.on_drop = on_drop
+
+    def put(self, item):
+        with self.condition:
+            dropped_item, self.latest_item = self.latest_item, item
+            if dropped_item is not None:
+                self.dropped_items += 1
+            self.condition.notify()
+        if dropped_item is not None and self.on_drop is not None:
+            self.on_drop(dropped_item)
+
+    def get(self, timeout=None):
+        with self.condition:
+            if self.latest_item is None:
+                self.condition.wait(timeout)
+            item, self.latest_item = self.latest_item, None
+            return item
+
+    def get_nowait(self):
+        with self.condition:
+            item, self.latest_item = self.latest_item, None
+            return item
+
+class FrameBufferPool:
+    def __init__(self, frame_shape, preallocated_buffers=4, capacity=8):
+        self.frame_shape = frame_shape
+        self.capacity = capacity
+        self.free_buffers = [np.empty(frame_shape, dtype=np.uint8) for _ in range(preallocated_buffers)]
+        self.allocations = preallocated_buffers
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.free_buffers:
+                return self.free_buffers.pop()
+            self.allocations += 1
+        return np.empty(self.frame_shape, dtype=np.uint8)
+
+    def release(self, frame_buffer):
+        if frame_buffer is None or frame_buffer.shape != self.frame_shape:
+            return
+        with self.lock:
+            if len(self.free_buffers) < self.capacity and not any(frame_buffer is free_buffer for free_buffer in self.free_buffers):
+                self.free_buffers.append(frame_buffer)
+
+class FrameSource:
+    def __init__(self, source=0):
+        self.source = int(source) if str(source).isdigit() else source
+        self.capture = None
+        self.skipped_frames = 0
+        self.frame_reader = None
+        self.frame_reader_stopped = threading.Event()
+
+    @property
+    def is_live(self):
+        return isinstance(self.source, int) or "://" in self.source
+
+    def open(self):
+        self.capture = cv2.VideoCapture(self.source)
+        return self.capture.isOpened()
+
+    def isOpened(self):
+        return self.capture is not None and self.capture.isOpened()
+
+    def read(self):
+        return self.capture.read()
+
+    def release(self):
+        self.stop_frame_reader()
+        if self.capture is not None:
+            self.capture.release()
+
+    def frame_rate(self):
+        reported_rate = self.capture.get(cv2.CAP_PROP_FPS)
+        return reported_rate if 1 <= reported_rate <= 240 else 30.0
+
+    def frames(self, stride=1, adaptive=False, speed=1.0, paced=False, reuse_buffer=False, skip_frames=None):
+        if adaptive and self.is_live:
+            yield from self.latest_frames(stride, reuse_buffer)
+            return
+        
+        frame_interval = 1.0 / self.frame_rate()
+        playback_interval = frame_interval / speed
+        start_time = time.perf_counter()
+        frame_index = 0
+        failed_reads = 0
+        frame = None
+        
+        while True:
+            success, frame = self.capture.read(frame if reuse_buffer else None)
+            if not success:
+                failed_reads += 1
+                if self.is_live and failed_reads < 100:
+                    time.sleep(0.01)
+                    continue
+                return
+            failed_reads = 0
+            
+            if paced and not self.is_live:
+                time.sleep(max(0.0, start_time + frame_index * playback_interval - time.perf_counter()))
+            timestamp = time.perf_counter() - start_time if self.is_live else frame_index * frame_interval
+            yield frame_index, timestamp, frame
+            
+            frames_to_skip = stride - 1
+            if not self.is_live:
+                if skip_frames is not None:
+                    frames_to_skip = max(frames_to_skip, skip_frames())
+                if adaptive:
+                    due_index = int((time.perf_counter() - start_time) / playback_interval)
+                    frames_to_skip = max(frames_to_skip, due_index - frame_index - 1)
+            for _ in range(frames_to_skip):
+                if not self.capture.grab():
+                    return
+            self.skipped_frames += frames_to_skip
+            frame_index += frames_to_skip + 1
+
+    def latest_frames(self, stride=1, reuse_buffer=False):
+        frame_pool = None
+        frame_width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        frame_height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if reuse_buffer and frame_width > 0 and frame_height > 0:
+            frame_pool = FrameBufferPool((frame_height, frame_width, 3), preallocated_buffers=3)
+        
+        def drop_frame(dropped):
+            self.skipped_frames += 1
+            if frame_pool is not None:
+                frame_pool.release(dropped[2])
+        
+        latest_frames = LatestFrameQueue(on_drop=drop_frame)
+        self.frame_reader_stopped.clear()
+        self.frame_reader = threading.Thread(target=self.read_latest_frames, args=(latest_frames, frame_pool, stride), name="frame-reader", daemon=True)
+        self.frame_reader.start()
+        try:
+            while True:
+                reader_running = self.frame_reader.is_alive()
+                latest = latest_frames.get(timeout=0.1)
+                if latest is None:
+                    if not reader_running:
+                        return
+                    continue
+                yield latest
+                if frame_pool is not None:
+                    frame_pool.release(latest[2])
+        finally:
+            self.stop_frame_reader()
+
+    def read_latest_frames(self, latest_frames, frame_pool, stride):
+        start_time = time.perf_counter()
+        frame_index = 0
+        failed_reads = 0
+        while not self.frame_reader_stopped.is_set():
+            success, frame = self.capture.read(frame_pool.acquire() if frame_pool is not None else None)
+            if not success:
+                failed_reads += 1
+                if failed_reads < 100:
+                    time.sleep(0.01)
+                    continue
+                return
+            failed_reads = 0
+            latest_frames.put((frame_index, time.perf_counter() - start_time, frame))
+            
+            for _ in range(stride - 1):
+                if not self.capture.grab():
+                    return
+            self.skipped_frames += stride - 1
+            frame_index += stride
 
-drawing_utils = mp.solutions.drawing_utils
-drawing_styles = mp.solutions.drawing_styles
+    def stop_frame_reader(self):
+        if self.frame_reader is not None:
+            self.frame_reader_stopped.set()
+            self.frame_reader.join()
+            self.frame_reader = None
+
+class PerformanceProfileTuner:
+    def __init__(self, target_fps, profile_name=PERFORMANCE_PROFILE_NAMES[0], warm_up_frames=5, sample_frames=20):
+        self.target_fps = target_fps
+        self.profile_name = profile_name
+        self.warm_up_frames = warm_up_frames
+        self.sample_frames = sample_frames
+        self.frames_seen = 0
+        self.frame_seconds = []
+        self.measured_fps = {}
+        self.settled = False
+
+    def expected_fps(self, frame_seconds):
+        poll_seconds = PERFORMANCE_PROFILES[self.profile_name]["poll_interval_ms"] / 1000
+        return 1.0 / max(frame_seconds, poll_seconds)
+
+    def observe(self, frame_seconds, face_found):
+        if self.settled or not face_found:
+            return None
+        self.frames_seen += 1
+        if self.frames_seen <= self.warm_up_frames:
+            return None
+        self.frame_seconds.append(frame_seconds)
+        if len(self.frame_seconds) < self.sample_frames:
+            return None
+        
+        self.measured_fps[self.profile_name] = self.expected_fps(float(np.median(self.frame_seconds)))
+        profile_index = PERFORMANCE_PROFILE_NAMES.index(self.profile_name)
+        if self.measured_fps[self.profile_name] >= self.target_fps:
+            self.settled = True
+            return None
+        self.profile_name = PERFORMANCE_PROFILE_NAMES[profile_index + 1]
+        self.frames_seen = 0
+        self.frame_seconds = []
+        self.settled = profile_index + 2 == len(PERFORMANCE_PROFILE_NAMES)
+        return self.profile_name
+
+    def describe(self):
+        measurements = ", ".join(f"{profile_name} {fps:.1f} fps" for profile_name, fps in self.measured_fps.items())
+        return f"Performance profile: picked '{self.profile_name}' for a {self.target_fps:g} fps target ({measurements})"
+
+class IdleScheduler:
+    def __init__(self, idle_after_frames=0, presence_check_interval=0.5):
+        self.idle_after_frames = idle_after_frames
+        self.presence_check_interval = presence_check_interval
+        self.frames_without_face = 0
+        self.idle = False
+        self.display_paused = False
+        self.state_seconds = {}
+        self.state_cpu_seconds = {}
+        self.accounted_at = time.perf_counter()
+        self.accounted_cpu_seconds = time.process_time()
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.display_paused:
+            return "paused"
+        return "idle" if self.idle else "active"
+
+    def frames_to_skip(self, frame_interval):
+        if not self.idle:
+            return 0
+        return max(0, round(self.presence_check_interval / frame_interval) - 1)
+
+    def observe(self, face_found):
+        self.account()
+        if face_found:
+            self.frames_without_face = 0
+        else:
+            self.frames_without_face += 1
+        self.idle = bool(self.idle_after_frames) and self.frames_without_face >= self.idle_after_frames
+
+    def wake(self):
+        self.account()
+        self.frames_without_face = 0
+        self.idle = False
+
+    def pause_display(self, paused):
+        if paused != self.display_paused:
+            self.account()
+            self.display_paused = paused
+
+    def account(self):
+        with self.lock:
+            now, cpu_seconds = time.perf_counter(), time.process_time()
+            state = self.state
+            self.state_seconds[state] = self.state_seconds.get(state, 0.0) + now - self.accounted_at
+            self.state_cpu_seconds[state] = self.state_cpu_seconds.get(state, 0.0) + cpu_seconds - self.accounted_cpu_seconds
+            self.accounted_at, self.accounted_cpu_seconds = now, cpu_seconds
+
+    @property
+    def throttled_share(self):
+        elapsed_seconds = sum(self.state_seconds.values())
+        return 1.0 - self.state_seconds.get("active", 0.0) / elapsed_seconds if elapsed_seconds else 0.0
+
+    def cpu_seconds_saved_per_hour(self):
+        self.account()
+        active_seconds = self.state_seconds.get("active", 0.0)
+        elapsed_seconds = sum(self.state_seconds.values())
+        if active_seconds < 1.0:
+            return 0.0
+        active_cpu_rate = self.state_cpu_seconds["active"] / active_seconds
+        cpu_seconds_saved = sum(
+            active_cpu_rate * state_seconds - self.state_cpu_seconds[state]
+            for state, state_seconds in self.state_seconds.items() if state != "active"
+        )
+        return max(0.0, cpu_seconds_saved) / elapsed_seconds * 3600
+
+    def describe(self):
+        cpu_seconds_saved = self.cpu_seconds_saved_per_hour()
+        return (f"Idle scheduler: throttled {self.throttled_share:.0%} of {sum(self.state_seconds.values()) / 60:.1f} min, "
+                f"saving about {cpu_seconds_saved:.0f} CPU s per hour ({cpu_seconds_saved / 36:.0f}% of a core)")
+
+class CameraPipeline:
+    def __init__(self, camera, frame_size=CAMERA_FRAME_SIZE, track_landmarks=False):
+        self.camera = camera
+        self.frame_size = frame_size
+        self.show_face_mesh = True
+        self.show_performance_hud = False
+        self.live_analysis = False
+        self.performance_profile = PERFORMANCE_PROFILE_NAMES[0]
+        self.profile_tuner = None
+        self.requested_overlay_density = None
+        self.poll_interval_ms = PERFORMANCE_PROFILES[self.performance_profile]["poll_interval_ms"]
+        self.overlay_density = "full"
+        self.overlay_text = None
+        self.quality_gate = None
+        self.gate_feedback = None
+        self.frame_rejections = deque(maxlen=16)
+        self.idle_scheduler = IdleScheduler()
+        self.face_present = False
+        self.presence_checked_at = 0.0
+        self.landmark_tracker = LandmarkTracker(landmark_cache.get_face_mesh_result) if track_landmarks else None
+        self.frame_pool = FrameBufferPool((frame_size[1], frame_size[0], 3))
+        self.captured_frames = LatestFrameQueue(on_drop=lambda captured: self.frame_pool.release(captured[1]))
+        self.processed_frames = LatestFrameQueue(on_drop=lambda processed: self.frame_pool.release(processed[1]))
+        self.frame_counter = 0
+        self.running = False
+        self.worker_threads = []
+
+    def start(self):
+        self.running = True
+        self.worker_threads = [
+            threading.Thread(target=self.capture_frames, name="camera-capture", daemon=True),
+            threading.Thread(target=self.run_inference, name="face-mesh-inference", daemon=True)
+        ]
+        for worker in self.worker_threads:
+            worker.start()
+
+    def stop(self):
+        self.running = False
+        for worker in self.worker_threads:
+            worker.join(timeout=1.0)
+        self.worker_threads = []
+
+    def apply_performance_profile(self, profile_name):
+        profile = PERFORMANCE_PROFILES[profile_name]
+        self.performance_profile = profile_name
+        self.overlay_density = self.requested_overlay_density or profile["overlay_density"]
+        self.poll_interval_ms = profile["poll_interval_ms"]
+        configure_face_mesh(face_mesh_max_faces, profile["refine_landmarks"])
+        if landmark_cache.region_selector is not None:
+            landmark_cache.region_selector.set_inference_scale(profile["inference_scale"])
+
+    def tune_performance_profile(self, frame_seconds, face_found):
+        next_profile = self.profile_tuner.observe(frame_seconds, face_found)
+        if next_profile is not None:
+            self.apply_performance_profile(next_profile)
+        if self.profile_tuner.settled:
+            print(self.profile_tuner.describe(), file=sys.stderr)
+
+    def capture_frames(self):
+        resized_frame = np.empty(self.frame_pool.frame_shape, dtype=np.uint8)
+        frame_interval = 1.0 / self.camera.frame_rate()
+        skip_idle_frames = lambda: self.idle_scheduler.frames_to_skip(frame_interval)
+        presence_checked_at = 0.0
+        read_started_at = time.perf_counter()
+        for frame_id, timestamp, camera_frame in self.camera.frames(adaptive=True, paced=True, reuse_buffer=True, skip_frames=skip_idle_frames):
+            if not self.running:
+                break
+            if self.camera.is_live and self.idle_scheduler.idle:
+                if time.perf_counter() - presence_checked_at < self.idle_scheduler.presence_check_interval:
+                    read_started_at = time.perf_counter()
+                    continue
+                presence_checked_at = time.perf_counter()
+            performance_monitor.record("camera_read", time.perf_counter() - read_started_at)
+            performance_monitor.frame_started(frame_id)
+            
+            with performance_monitor.span("frame_convert"):
+                cv2.resize(camera_frame, self.frame_size, dst=resized_frame)
+                frame = self.frame_pool.acquire()
+                cv2.cvtColor(resized_frame, cv2.COLOR_BGR2RGB, dst=frame)
+            self.frame_counter += 1
+            self.captured_frames.put((frame_id, frame))
+            read_started_at = time.perf_counter()
+
+    def run_inference(self):
+        while self.running:
+            captured = self.captured_frames.get(timeout=0.1)
+            if captured is None:
+                continue
+            
+            frame_id, frame = captured
+            frame_started_at = time.perf_counter()
+            landmark_arrays = None
+            rejection = None
+            if self.quality_gate is not None:
+                with performance_monitor.span("quality_gate"):
+                    rejection = self.quality_gate.check(frame)
+                if rejection is not None:
+                    self.frame_rejections.append((frame_id, rejection))
+            self.gate_feedback = FRAME_GATE_FEEDBACK.get(rejection)
+            presence_check_due = self.idle_scheduler.idle_after_frames and frame_started_at - self.presence_checked_at >= self.idle_scheduler.presence_check_interval
+            if rejection is None and (self.show_face_mesh or self.live_analysis or self.idle_scheduler.idle or presence_check_due):
+                with performance_monitor.span("face_mesh"):
+                    landmark_arrays = self.overlay_landmarks(frame, frame_id)
+                self.face_present = bool(landmark_arrays)
+                self.presence_checked_at = frame_started_at
+            elif rejection is not None:
+                self.face_present = False
+            self.idle_scheduler.observe(self.face_present)
+            if self.idle_scheduler.display_paused:
+                self.processed_frames.put((frame_id, frame, None))
+                continue
+            
+            display_frame = frame
+            if self.show_face_mesh or self.overlay_text or self.gate_feedback or self.show_performance_hud:
+                display_frame = self.frame_pool.acquire()
+                np.copyto(display_frame, frame)
+            if self.show_face_mesh and landmark_arrays:
+                with performance_monitor.span("overlay_draw"):
+                    draw_face_landmarks(display_frame, landmark_arrays, self.overlay_density)
+            if self.overlay_text:
+                cv2.putText(display_frame, self.overlay_text, (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 0, 0), 3)
+            status_lines = [(self.gate_feedback, (255, 210, 0))] if self.gate_feedback else []
+            if self.show_performance_hud:
+                status_lines.extend((hud_line, (80, 255, 80)) for hud_line in performance_monitor.heads_up_display())
+                tuning_text = " (tuning)" if self.profile_tuner is not None and not self.profile_tuner.settled else ""
+                status_lines.append((f"profile {self.performance_profile}{tuning_text}", (80, 255, 80)))
+                if self.idle_scheduler.idle_after_frames:
+                    status_lines.append((f"{self.idle_scheduler.state}, throttled {self.idle_scheduler.throttled_share:.0%}", (80, 255, 80)))
+            if status_lines:
+                self.draw_status_lines(display_frame, status_lines)
+            
+            with performance_monitor.span("image_convert"):
+                display_image = Image.fromarray(display_frame)
+            if display_frame is not frame:
+                self.frame_pool.release(display_frame)
+            self.processed_frames.put((frame_id, frame, display_image))
+            if self.profile_tuner is not None and not self.profile_tuner.settled:
+                self.tune_performance_profile(time.perf_counter() - frame_started_at, bool(landmark_arrays))
+
+    def draw_status_lines(self, display_frame, status_lines):
+        text_bottom = display_frame.shape[0] - 12
+        cv2.rectangle(display_frame, (0, text_bottom - 20 * len(status_lines) + 2), (display_frame.shape[1], display_frame.shape[0]), (0, 0, 0), -1)
+        for line_number, (status_line, text_color) in enumerate(reversed(status_lines)):
+            cv2.putText(display_frame, status_line, (10, text_bottom - 20 * line_number), cv2.FONT_HERSHEY_SIMPLEX, 0.5, text_color, 1)
+
+    def frame_rejection(self, frame_id):
+        for rejected_frame_id, rejection in self.frame_rejections:
+            if rejected_frame_id == frame_id:
+                return rejection
+        return None
+
+    def overlay_landmarks(self, frame, frame_id):
+        if self.landmark_tracker is None:
+            return landmark_cache.get_face_mesh_result(frame, frame_id).landmark_arrays
+        
+        face_mesh_result, smoothed_result = self.landmark_tracker.track(frame, frame_id)
+        landmark_cache.store_result(frame_id, face_mesh_result)
+        return smoothed_result.landmark_arrays
+
+class FeatureCategory(str, Enum):
+    def __str__(self):
+        return self.value
+
+class SkinUndertone(FeatureCategory):
+    WARM = "warm (golden/peachy)"
+    NEUTRAL_OLIVE = "neutral (olive)"
+    NEUTRAL = "neutral (balanced)"
+    COOL = "cool (pinkish)"
+    UNKNOWN = "could not determine"
+
+class FaceShape(FeatureCategory):
+    HEART = "heart (wider forehead, narrow chin)"
+    OVAL = "oval (balanced proportions)"
+    OBLONG = "oblong (long and narrow)"
+    SQUARE = "square (strong jawline)"
+    ROUND = "round (similar width and length)"
+    DIAMOND = "diamond (wide cheekbones)"
+
+class NoseShape(FeatureCategory):
+    WIDE_NARROW_BRIDGE = "wide with narrow bridge"
+    WIDE = "wide (broad nostrils)"
+    NARROW = "narrow (slim)"
+    LONG = "long (prominent)"
+    THIN = "thin (delicate bridge)"
+    SHORT = "short (button-like)"
+    BALANCED = "balanced (classic proportions)"
+
+def load_recommendation_rules(rules_path=RECOMMENDATION_RULES_PATH):
+    with open(rules_path, encoding="utf-8") as rules_file:
+        return json.load(rules_file)
+
+class RecommendationEngine:
+    def __init__(self, rules, seed=None):
+        self.seed = seed
+        self.recommendation_tables = {}
+        
+        contouring_rules = rules["contouring"]
+        highlight_rules = rules["highlights"]
+        self.highlight_sample_size = highlight_rules["sample_size"]
+        
+        self.skin_tone_tables = {}
+        for skin_tone in SkinUndertone:
+            undertone_family = rules["undertone_families"][skin_tone.name.lower()]
+            self.skin_tone_tables[skin_tone] = {
+                "contouring": tuple(contouring_rules["undertone_family"][undertone_family]),
+                "highlights": tuple(highlight_rules["undertone_family"][undertone_family]),
+                "makeup": tuple(rules["makeup"][undertone_family]),
+                "jewelry": tuple(rules["jewelry"][undertone_family])
+            }
+        
+        self.face_shape_tables = {}
+        for face_shape in FaceShape:
+            shape_name = face_shape.name.lower()
+            self.face_shape_tables[face_shape] = {
+                "contouring": tuple(contouring_rules["face_shape"][shape_name]),
+                "highlights": tuple(highlight_rules["face_shape"].get(shape_name, ())),
+                "haircuts": tuple(rules["haircuts"][shape_name]),
+                "glasses": tuple(rules["glasses"][shape_name]),
+                "earrings": tuple(rules["earrings"][shape_name])
+            }
+        
+        self.nose_shape_contouring = {
+            nose_shape: tuple(contouring_rules["nose_shape"][nose_shape.name.lower()]) for nose_shape in NoseShape
+        }
+
+    @classmethod
+    def from_file(cls, rules_path=RECOMMENDATION_RULES_PATH, seed=None):
+        return cls(load_recommendation_rules(rules_path), seed)
+
+    def recommend(self, skin_tone, face_shape, nose_shape):
+        lookup_key = (SkinUndertone(skin_tone), FaceShape(face_shape), NoseShape(nose_shape))
+        recommendations = self.recommendation_tables.get(lookup_key)
+        if recommendations is None:
+            recommendations = self.recommendation_tables[lookup_key] = self.compile_recommendations(*lookup_key)
+        
+        if self.seed is not None:
+            return recommendations
+        highlight_colors = recommendations["highlights"]
+        return {**recommendations, "highlights": random.sample(highlight_colors, min(self.highlight_sample_size, len(highlight_colors)))}
+
+    def compile_recommendations(self, skin_tone, face_shape, nose_shape):
+        skin_tone_table = self.skin_tone_tables[skin_tone]
+        face_shape_table = self.face_shape_tables[face_shape]
+        
+        highlight_colors = skin_tone_table["highlights"] + face_shape_table["highlights"]
+        if self.seed is not None:
+            highlight_generator = random.Random(f"{self.seed}:{skin_tone.name}:{face_shape.name}")
+            highlight_colors = tuple(highlight_generator.sample(highlight_colors, min(self.highlight_sample_size, len(highlight_colors))))
+        
+        return {
+            "highlights": highlight_colors,
+            "contouring": face_shape_table["contouring"] + self.nose_shape_contouring[nose_shape] + skin_tone_table["contouring"],
+            "haircuts": face_shape_table["haircuts"],
+            "glasses": face_shape_table["glasses"],
+            "earrings": face_shape_table["earrings"],
+            "makeup": skin_tone_table["makeup"],
+            "jewelry": skin_tone_table["jewelry"]
+        }
+
+class FaceAnalyzer:
+    def __init__(self, channel_order="bgr", recommendation_seed=None):
+        self.channel_order = channel_order
+        self.recommendation_engine = RecommendationEngine.from_file(seed=recommendation_seed)
+        self.skin_region_indices = [np.array(region_points) for region_name, region_points in SKIN_SAMPLING_REGIONS]
+        self.skin_region_masks = {}
+
+    def analyze_face(self, image, landmark_points):
+        return self.analyze_faces(image, [landmark_points])[0]
+
+    def analyze_faces(self, image, landmark_arrays):
+        all_landmark_points = np.stack(landmark_arrays)
+        face_measurements = zip(
+            zip(*self.measure_face_structure(all_landmark_points)),
+            zip(*self.measure_nose_structure(all_landmark_points)),
+            zip(*self.measure_facial_features(all_landmark_points))
+        )
+        
+        face_analyses = []
+        for landmark_points, (face_structure, nose_structure, facial_features) in zip(landmark_arrays, face_measurements):
+            skin_tone, skin_tone_confidence = self.analyze_skin_tone_with_confidence(image, landmark_points)
+            face_shape = self.classify_face_structure(*face_structure)
+            eyebrows, lip_shape = self.classify_facial_features(*facial_features)
+            nose_shape = self.classify_nose_structure(*nose_structure)
+            
+            face_analyses.append({
+                "skin_tone": skin_tone,
+                "skin_tone_confidence": skin_tone_confidence,
+                "face_shape": face_shape,
+                "nose_shape": nose_shape,
+                "eyebrows": eyebrows,
+                "lip_shape": lip_shape,
+                **self.recommendation_engine.recommend(skin_tone, face_shape, nose_shape)
+            })
+        return face_analyses
+
+    def analyze_skin_tone(self, image, landmark_points):
+        return self.analyze_skin_tone_with_confidence(image, landmark_points)[0]
+
+    def analyze_skin_tone_with_confidence(self, image, landmark_points):
+        skin_pixels, region_ids = self.sample_skin_pixels(image, landmark_points)
+        return self.classify_skin_pixels(skin_pixels, region_ids)
+
+    def skin_region_mask(self, image_dimensions):
+        mask_size = tuple(image_dimensions[:2])
+        if mask_size not in self.skin_region_masks:
+            self.skin_region_masks[mask_size] = np.zeros(mask_size, dtype=np.uint8)
+        return self.skin_region_masks[mask_size]
+
+    def sample_skin_pixels(self, image, landmark_points):
+        height, width = image.shape[:2]
+        region_polygons = [np.round(landmark_points[region_points, :2]).astype(np.int32) for region_points in self.skin_region_indices]
+        
+        all_corners = np.concatenate(region_polygons)
+        left, top = np.clip(all_corners.min(axis=0), 0, (width, height))
+        right, bottom = np.clip(all_corners.max(axis=0) + 1, 0, (width, height))
+        if right <= left or bottom <= top:
+            return np.empty((0, 3), dtype=image.dtype), np.empty(0, dtype=np.uint8)
+        
+        mask_window = self.skin_region_mask(image.shape)[top:bottom, left:right]
+        mask_window[:] = 0
+        for region_id, region_polygon in enumerate(region_polygons, start=1):
+            cv2.fillPoly(mask_window, [region_polygon - (left, top)], region_id)
+        
+        inside_regions = mask_window > 0
+        return image[top:bottom, left:right][inside_regions], mask_window[inside_regions]
+
+    def classify_skin_pixels(self, skin_pixels, region_ids):
+        if not len(skin_pixels):
+            return SkinUndertone.UNKNOWN, 0.0
+        return self.classify_skin_samples(skin_pixels[np.newaxis], region_ids[np.newaxis], np.array([len(skin_pixels)]))[0]
+
+    def classify_skin_samples(self, skin_pixels, region_ids, sample_counts):
+        if self.channel_order == "rgb":
+            skin_pixels = skin_pixels[..., ::-1]
+        skin_pixels = np.ascontiguousarray(skin_pixels)
+        sample_valid = np.arange(skin_pixels.shape[1]) < np.asarray(sample_counts)[:, np.newaxis]
+        color_channels = np.moveaxis(skin_pixels, -1, 1)
+        
+        face_colors = masked_median(color_channels, sample_valid[:, np.newaxis])
+        region_colors = []
+        for region_id in range(1, len(self.skin_region_indices) + 1):
+            region_valid = sample_valid & (region_ids == region_id)
+            region_colors.append((masked_median(color_channels, region_valid[:, np.newaxis]), region_valid.any(axis=1)))
+        
+        lab_pixels = cv2.cvtColor(skin_pixels.reshape(-1, 1, 3), cv2.COLOR_BGR2LAB).reshape(skin_pixels.shape).astype(np.float32)
+        chroma = np.moveaxis(lab_pixels[..., 1:], -1, 1)
+        chroma_deviation = np.abs(chroma - masked_median(chroma, sample_valid[:, np.newaxis])[..., np.newaxis])
+        chroma_spread = masked_median(chroma_deviation.reshape(len(chroma), -1), np.concatenate([sample_valid, sample_valid], axis=1))
+        
+        skin_classifications = []
+        for face_index, sample_count in enumerate(sample_counts):
+            if not sample_count:
+                skin_classifications.append((SkinUndertone.UNKNOWN, 0.0))
+                continue
+            skin_tone = self.determine_undertone(face_colors[face_index])
+            region_tones = [
+                self.determine_undertone(region_color[face_index])
+                for region_color, region_present in region_colors if region_present[face_index]
+            ]
+            region_agreement = region_tones.count(skin_tone) / len(region_tones)
+            color_consistency = 1.0 / (1.0 + chroma_spread[face_index] / 8.0)
+            skin_classifications.append((skin_tone, round(float(region_agreement * color_consistency), 2)))
+        return skin_classifications
+
+    def determine_undertone(self, color_values):
+        blue, green, red = color_values
+        
+        red_blue_diff = red - blue
+        green_blue_diff = green - blue
+        
+        if red_blue_diff > 15 and green_blue_diff > 15:
+            if red > green * 1.1:
+                return SkinUndertone.WARM
+            elif green > red * 1.1:
+                return SkinUndertone.NEUTRAL_OLIVE
+            else:
+                return SkinUndertone.NEUTRAL
+        elif red_blue_diff < -10:
+            return SkinUndertone.COOL
+        else:
+            return SkinUndertone.NEUTRAL
+
+    def determine_face_structure(self, landmark_points):
+        return self.classify_face_structure(*self.measure_face_structure(landmark_points))
+
+    def measure_face_structure(self, landmark_points):
+        left_face, right_face, left_temple, right_temple, forehead_top, chin = landmark_rows(landmark_points, [454, 234, 21, 251, 10, 152])
+        
+        jaw_width = np.abs(left_face[..., 0] - right_face[..., 0])
+        forehead_width = np.abs(left_temple[..., 0] - right_temple[..., 0])
+        face_height = np.abs(forehead_top[..., 1] - chin[..., 1])
+        cheek_width = np.abs(left_face[..., 0] - right_face[..., 0])
+        
+        jaw_to_forehead = jaw_width / forehead_width
+        height_to_width = face_height / cheek_width
+        cheek_to_jaw_difference = np.abs(cheek_width - jaw_width) / cheek_width
+        return jaw_to_forehead, height_to_width, cheek_to_jaw_difference
+
+    def classify_face_structure(self, jaw_to_forehead, height_to_width, cheek_to_jaw_difference):
+        if height_to_width > 1.5:
+            if jaw_to_forehead < 0.85:
+                return FaceShape.HEART
+            elif 0.85 <= jaw_to_forehead <= 1.15:
+                return FaceShape.OVAL
+            else:
+                return FaceShape.OBLONG
+        elif height_to_width <= 1.5:
+            if jaw_to_forehead > 1.1:
+                return FaceShape.SQUARE
+            elif cheek_to_jaw_difference < 0.1:
+                return FaceShape.ROUND
+            else:
+                return FaceShape.DIAMOND
+        return FaceShape.OVAL
+
+    def analyze_nose_structure(self, landmark_points):
+        return self.classify_nose_structure(*self.measure_nose_structure(landmark_points))
+
+    def measure_nose_structure(self, landmark_points):
+        left_face, right_face, forehead_top, chin = landmark_rows(landmark_points, [454, 234, 10, 152])
+        left_nostril, right_nostril, nose_bridge, nose_tip, left_bridge, right_bridge = landmark_rows(landmark_points, [129, 358, 1, 4, 44, 276])
+        
+        face_width = np.abs(left_face[..., 0] - right_face[..., 0])
+        face_height = np.abs(forehead_top[..., 1] - chin[..., 1])
+        
+        nose_width = np.abs(left_nostril[..., 0] - right_nostril[..., 0])
+        nose_length = np.abs(nose_bridge[..., 1] - nose_tip[..., 1])
+        bridge_width = np.abs(left_bridge[..., 0] - right_bridge[..., 0])
+        
+        width_proportion = nose_width / face_width
+        length_proportion = nose_length / face_height
+        bridge_proportion = bridge_width / nose_width
+        return width_proportion, length_proportion, bridge_proportion
+
+    def classify_nose_structure(self, width_proportion, length_proportion, bridge_proportion):
+        if width_proportion > 0.25:
+            if bridge_proportion < 0.3:
+                return NoseShape.WIDE_NARROW_BRIDGE
+            else:
+                return NoseShape.WIDE
+        elif width_proportion < 0.15:
+            return NoseShape.NARROW
+        elif length_proportion > 0.3:
+            return NoseShape.LONG
+        elif bridge_proportion < 0.25:
+            return NoseShape.THIN
+        elif length_proportion < 0.2:
+            return NoseShape.SHORT
+        else:
+            return NoseShape.BALANCED
+
+    def describe_facial_features(self, landmark_points):
+        return self.classify_facial_features(*self.measure_facial_features(landmark_points))
+
+    def measure_facial_features(self, landmark_points):
+        eyebrow_outer, eyebrow_inner, upper_lip, lower_lip, left_lip_corner, right_lip_corner = landmark_rows(landmark_points, [70, 105, 13, 14, 78, 308])
+        
+        eyebrow_thickness = np.abs(eyebrow_outer[..., 1] - eyebrow_inner[..., 1])
+        lip_opening = lower_lip[..., 1] - upper_lip[..., 1]
+        lip_width = np.abs(left_lip_corner[..., 0] - right_lip_corner[..., 0])
+        return eyebrow_thickness, lip_opening, lip_width
+
+    def classify_facial_features(self, eyebrow_thickness, lip_opening, lip_width):
+        eyebrow_style = "arched" if eyebrow_thickness < 10 else "straight"
+
+        lip_height = abs(lip_opening)
+        lip_ratio = lip_width / max(lip_height, 1)
+
+        if lip_ratio < 1.2:
+            lip_style = "round"
+        elif lip_height > 16:
+            lip_style = "full"
+        elif lip_height < 8:
+            lip_style = "thin"
+        elif lip_opening > 0 and lip_width > 90:
+            lip_style = "bunny"
+        elif lip_opening > 12 and lip_width > 95:
+            lip_style = "heart"
+        elif lip_width > 120 and lip_height < 10:
+            lip_style = "diamond"
+        else:
+            lip_style = "balanced"
+
+        return eyebrow_style, lip_style
+
+class LiveFaceStatistics:
+    def __init__(self, smoothing, vote_window, skin_frames):
+        self.smoothing = smoothing
+        self.measurements = None
+        self.skin_samples = deque(maxlen=skin_frames)
+        self.label_votes = deque(maxlen=vote_window)
+        self.skin_tone_confidences = {}
+        self.published_labels = None
+        self.missed_updates = 0
+
+    def add_measurements(self, face_measurements):
+        if self.measurements is None:
+            self.measurements = face_measurements
+        else:
+            self.measurements += self.smoothing * (face_measurements - self.measurements)
+
+    def stable_labels(self, min_agreement):
+        if len(self.label_votes) < self.label_votes.maxlen:
+            return None
+        stable_labels = []
+        for category_votes in zip(*self.label_votes):
+            label, votes = Counter(category_votes).most_common(1)[0]
+            if votes < min_agreement * len(category_votes):
+                return None
+            stable_labels.append(label)
+        return tuple(stable_labels)
+
+class LiveAnalysis:
+    def __init__(self, face_analyzer, smoothing=0.25, vote_window=10, min_agreement=0.7, skin_frames=20, skin_pixels_per_frame=400):
+        self.face_analyzer = face_analyzer
+        self.smoothing = smoothing
+        self.vote_window = vote_window
+        self.min_agreement = min_agreement
+        self.skin_frames = skin_frames
+        self.skin_pixels_per_frame = skin_pixels_per_frame
+        self.face_statistics = {}
+        self.stable_analyses = {}
+        self.random_generator = np.random.default_rng(0)
+
+    def update(self, image, face_mesh_result):
+        published_analyses = {}
+        for face_id, landmark_points in zip(face_mesh_result.face_ids, face_mesh_result.landmark_arrays):
+            if face_id not in self.face_statistics:
+                self.face_statistics[face_id] = LiveFaceStatistics(self.smoothing, self.vote_window, self.skin_frames)
+            face_analysis = self.update_face(self.face_statistics[face_id], image, landmark_points)
+            if face_analysis is not None:
+                published_analyses[face_id] = self.stable_analyses[face_id] = face_analysis
+        
+        for face_id in list(self.face_statistics):
+            if face_id in face_mesh_result.face_ids:
+                self.face_statistics[face_id].missed_updates = 0
+                continue
+            self.face_statistics[face_id].missed_updates += 1
+            if self.face_statistics[face_id].missed_updates > self.vote_window:
+                del self.face_statistics[face_id]
+                self.stable_analyses.pop(face_id, None)
+        return published_analyses
+
+    def update_face(self, face_statistics, image, landmark_points):
+        face_analyzer = self.face_analyzer
+        face_statistics.add_measurements(np.array([
+            *face_analyzer.measure_face_structure(landmark_points),
+            *face_analyzer.measure_nose_structure(landmark_points),
+            *face_analyzer.measure_facial_features(landmark_points)
+        ], dtype=np.float64))
+        
+        skin_pixels, region_ids = face_analyzer.sample_skin_pixels(image, landmark_points)
+        if len(skin_pixels) > self.skin_pixels_per_frame:
+            kept_pixels = self.random_generator.choice(len(skin_pixels), self.skin_pixels_per_frame, replace=False)
+            skin_pixels, region_ids = skin_pixels[kept_pixels], region_ids[kept_pixels]
+        face_statistics.skin_samples.append((skin_pixels, region_ids))
+        skin_tone, skin_tone_confidence = face_analyzer.classify_skin_pixels(
+            np.concatenate([pixels for pixels, ids in face_statistics.skin_samples]),
+            np.concatenate([ids for pixels, ids in face_statistics.skin_samples])
+        )
+        face_statistics.skin_tone_confidences[skin_tone] = skin_tone_confidence
+        
+        face_structure, nose_structure, facial_features = face_statistics.measurements.reshape(3, 3)
+        face_statistics.label_votes.append((
+            skin_tone,
+            face_analyzer.classify_face_structure(*face_structure),
+            face_analyzer.classify_nose_structure(*nose_structure),
+            *face_analyzer.classify_facial_features(*facial_features)
+        ))
+        
+        stable_labels = face_statistics.stable_labels(self.min_agreement)
+        if stable_labels is None or stable_labels == face_statistics.published_labels:
+            return None
+        face_statistics.published_labels = stable_labels
+        skin_tone, face_shape, nose_shape, eyebrows, lip_shape = stable_labels
+        return {
+            "skin_tone": skin_tone,
+            "skin_tone_confidence": face_statistics.skin_tone_confidences[skin_tone],
+            "face_shape": face_shape,
+            "nose_shape": nose_shape,
+            "eyebrows": eyebrows,
+            "lip_shape": lip_shape,
+            **face_analyzer.recommendation_engine.recommend(skin_tone, face_shape, nose_shape)
+        }
+
+def bulleted_text(items):
+    return "".join(f"• {item}\n" for item in items)
 
 class BeautyAdvisor:
-    def __init__(self, window):
+    def __init__(self, window, frame_source=0, track_landmarks=False, show_performance_hud=False, live_analysis=False, overlay_density=None, result_store=None,
+                 quality_gate=None, performance_profile="quality", target_fps=None, idle_after_frames=0, pause_when_minimized=False):
         self.window = window
         self.window.title("Beauty Advisor Pro")
         self.window.geometry("1200x800")
@@ -32,6 +1613,7 @@ class BeautyAdvisor:
         self.visual_style.map('TNotebook.Tab', background=[('selected', '#4a6fa5')], foreground=[('selected', 'white')])
         
         self.current_skin_tone = "Analyzing..."
+        self.current_skin_tone_confidence = None
         self.current_face_shape = "Analyzing..."
         self.current_eyebrows = "Analyzing..."
         self.current_lip_shape = "Analyzing..."
@@ -43,12 +1625,40 @@ class BeautyAdvisor:
         self.recommended_earrings = []
         self.makeup_recommendations = []
         self.jewelry_suggestions = []
+        self.face_analyses = {}
+        self.selected_face_id = None
+        self.displayed_results = {}
+        self.pending_results_view = None
+        self.results_refresh_job = None
+        self.face_analyzer = FaceAnalyzer(channel_order="rgb")
+        self.frame_source = frame_source
+        self.track_landmarks = track_landmarks
+        self.show_performance_hud = show_performance_hud
+        self.overlay_density = overlay_density
+        self.performance_profile = performance_profile
+        self.target_fps = target_fps
+        self.idle_after_frames = idle_after_frames
+        self.pause_when_minimized = pause_when_minimized
+        self.result_store = result_store
+        self.quality_gate = quality_gate
         self.camera = None
+        self.camera_startup = None
+        self.camera_pipeline = None
+        self.last_camera_frame = None
+        self.last_camera_frame_id = None
         self.current_photo = None
-        self.camera_active = False
+        self.capture_state = "idle"
+        self.capture_burst = []
+        self.capture_burst_size = 5
+        self.capture_burst_timer = None
         self.show_face_mesh = True
+        self.live_analysis = None
+        self.live_analysis_interval = 0.2
+        self.last_live_analysis_time = 0.0
         
         self.setup_interface()
+        if live_analysis:
+            self.switch_live_analysis()
         self.initialize_camera()
 
     def setup_interface(self):
@@ -82,6 +1692,13 @@ class BeautyAdvisor:
         )
         self.mesh_button.pack(side=tk.LEFT, padx=10)
         
+        self.live_button = tk.Button(
+            button_panel, text="Start Live Analysis", command=self.switch_live_analysis,
+            font=("Arial", 12, "bold"), bg="#6c757d", fg="white",
+            activebackground="#5a6268", relief=tk.FLAT, width=18, height=2
+        )
+        self.live_button.pack(side=tk.LEFT, padx=10)
+        
         results_panel = tk.Frame(main_container, bg="#ffffff", bd=0, highlightbackground="#c9d0de", highlightthickness=2, relief=tk.RAISED)
         results_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=10, pady=10)
         
@@ -89,6 +1706,13 @@ class BeautyAdvisor:
         results_header.pack(fill=tk.X)
         tk.Label(results_header, text="Beauty Analysis", font=("Arial", 14, "bold"), bg="#4a6fa5", fg="white").pack(pady=8)
         
+        face_selector_panel = tk.Frame(results_panel, bg="#ffffff")
+        face_selector_panel.pack(fill=tk.X, padx=10, pady=(10, 0))
+        tk.Label(face_selector_panel, text="Showing results for:", font=("Arial", 10), bg="#ffffff", fg="#495057").pack(side=tk.LEFT)
+        self.face_selector = ttk.Combobox(face_selector_panel, state=tk.DISABLED, width=12, values=[])
+        self.face_selector.pack(side=tk.LEFT, padx=8)
+        self.face_selector.bind("<<ComboboxSelected>>", self.select_face_from_list)
+        
         self.analysis_notebook = ttk.Notebook(results_panel)
         self.analysis_notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
@@ -169,433 +1793,1199 @@ class BeautyAdvisor:
     
     def switch_mesh_display(self):
         self.show_face_mesh = not self.show_face_mesh
-        if hasattr(self, 'last_camera_frame'):
-            self.process_face_image(self.last_camera_frame, update_only=True)
+        if self.camera_pipeline is not None:
+            self.camera_pipeline.show_face_mesh = self.show_face_mesh
+        if self.last_camera_frame is not None:
+            self.show_display_image(self.render_camera_frame(self.last_camera_frame, self.last_camera_frame_id))
     
     def initialize_camera(self):
-        self.camera = cv2.VideoCapture(0)
-        if not self.camera.isOpened():
-            messagebox.showerror("Error", "Could not open camera")
+        self.camera = FrameSource(self.frame_source)
+        self.camera_display.config(text="Starting camera and face model...", font=("Arial", 12), fg="#495057")
+        self.capture_button.config(state=tk.DISABLED)
+        threading.Thread(target=self.start_camera_in_background, name="camera-startup", daemon=True).start()
+        self.finish_camera_startup()
+    
+    def start_camera_in_background(self):
+        model_warm_up = threading.Thread(target=warm_up_face_mesh, name="face-mesh-warm-up", daemon=True)
+        model_warm_up.start()
+        camera_opened = self.camera.open()
+        model_warm_up.join()
+        self.camera_startup = camera_opened
+    
+    def finish_camera_startup(self):
+        if self.camera_startup is None:
+            self.window.after(50, self.finish_camera_startup)
             return
+        self.camera_display.config(text="")
+        self.capture_button.config(state=tk.NORMAL)
+        if not self.camera_startup:
+            messagebox.showerror("Error", f"Could not open camera or video source: {self.frame_source}")
+            return
+        self.camera_pipeline = CameraPipeline(self.camera, track_landmarks=self.track_landmarks)
+        self.camera_pipeline.show_face_mesh = self.show_face_mesh
+        self.camera_pipeline.show_performance_hud = self.show_performance_hud
+        self.camera_pipeline.requested_overlay_density = self.overlay_density
+        self.camera_pipeline.apply_performance_profile(self.performance_profile)
+        if self.target_fps is not None:
+            self.camera_pipeline.profile_tuner = PerformanceProfileTuner(self.target_fps, self.performance_profile)
+        self.camera_pipeline.quality_gate = self.quality_gate
+        self.camera_pipeline.live_analysis = self.live_analysis is not None
+        self.camera_pipeline.idle_scheduler.idle_after_frames = self.idle_after_frames
+        performance_monitor.idle_scheduler = self.camera_pipeline.idle_scheduler if self.idle_after_frames or self.pause_when_minimized else None
+        self.camera_pipeline.start()
         self.update_camera_feed()
     
     def update_camera_feed(self):
-        if not self.camera_active and self.camera is not None:
-            success, frame = self.camera.read()
-            if success:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frame = cv2.resize(frame, (640, 480))
-                
-                self.last_camera_frame = frame.copy()
-                
-                if self.show_face_mesh:
-                    frame = self.draw_face_landmarks(frame)
-                
-                display_image = Image.fromarray(frame)
-                self.current_photo = ImageTk.PhotoImage(image=display_image)
-                self.camera_display.config(image=self.current_photo)
-        self.window.after(15, self.update_camera_feed)
-    
-    def draw_face_landmarks(self, image):
-        image_bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-        face_results = face_mesh_model.process(image_bgr)
-        
-        if face_results.multi_face_landmarks:
-            for landmarks in face_results.multi_face_landmarks:
-                drawing_utils.draw_landmarks(
-                    image=image,
-                    landmark_list=landmarks,
-                    connections=mp.solutions.face_mesh.FACEMESH_TESSELATION,
-                    landmark_drawing_spec=None,
-                    connection_drawing_spec=drawing_styles.get_default_face_mesh_tesselation_style())
-                
-                drawing_utils.draw_landmarks(
-                    image=image,
-                    landmark_list=landmarks,
-                    connections=mp.solutions.face_mesh.FACEMESH_CONTOURS,
-                    landmark_drawing_spec=None,
-                    connection_drawing_spec=drawing_styles.get_default_face_mesh_contours_style())
-        
-        return image
+        poll_interval_ms = 15
+        if self.camera_pipeline is not None:
+            idle_scheduler = self.camera_pipeline.idle_scheduler
+            idle_scheduler.pause_display(self.pause_when_minimized and self.window.state() == "iconic")
+            poll_interval_ms = self.camera_pipeline.poll_interval_ms
+            if idle_scheduler.idle or idle_scheduler.display_paused:
+                poll_interval_ms = max(poll_interval_ms, IDLE_POLL_INTERVAL_MS)
+            
+            processed = self.camera_pipeline.processed_frames.get_nowait()
+            if processed is not None:
+                previous_frame = self.last_camera_frame
+                self.last_camera_frame_id, self.last_camera_frame, display_image = processed
+                if display_image is not None:
+                    with performance_monitor.span("display_update"):
+                        self.show_display_image(display_image)
+                    performance_monitor.frame_displayed(self.last_camera_frame_id)
+                if self.capture_state == "burst":
+                    self.collect_capture_burst(self.last_camera_frame_id, self.last_camera_frame)
+                elif self.live_analysis is not None and self.capture_state == "idle":
+                    self.update_live_analysis(self.last_camera_frame, self.last_camera_frame_id)
+                self.release_camera_frame(previous_frame)
+        self.window.after(poll_interval_ms, self.update_camera_feed)
+    
+    def switch_live_analysis(self):
+        if self.live_analysis is None:
+            self.live_analysis = LiveAnalysis(self.face_analyzer)
+            self.live_button.config(text="Stop Live Analysis", bg="#4a6fa5")
+        else:
+            self.live_analysis = None
+            self.live_button.config(text="Start Live Analysis", bg="#6c757d")
+            if self.camera_pipeline is not None and self.capture_state == "idle":
+                self.camera_pipeline.overlay_text = None
+        if self.camera_pipeline is not None:
+            self.camera_pipeline.live_analysis = self.live_analysis is not None
+    
+    def update_live_analysis(self, frame, frame_id):
+        current_time = time.perf_counter()
+        if current_time - self.last_live_analysis_time < self.live_analysis_interval or self.camera_pipeline.frame_rejection(frame_id):
+            return
+        face_mesh_result = landmark_cache.cached_face_mesh_result(frame, frame_id)
+        if face_mesh_result is None:
+            return
+        self.last_live_analysis_time = current_time
+        
+        with performance_monitor.span("analysis"):
+            published_analyses = self.live_analysis.update(frame, face_mesh_result)
+        self.camera_pipeline.overlay_text = None if self.live_analysis.stable_analyses else "Hold still..."
+        if published_analyses or self.live_analysis.stable_analyses.keys() != self.face_analyses.keys():
+            if self.live_analysis.stable_analyses:
+                with performance_monitor.span("results_update"):
+                    self.show_face_analyses(dict(self.live_analysis.stable_analyses))
+    
+    def release_camera_frame(self, frame):
+        if frame is None or frame is self.last_camera_frame:
+            return
+        if any(frame is burst_frame for burst_frame_id, burst_frame in self.capture_burst):
+            return
+        self.camera_pipeline.frame_pool.release(frame)
+    
+    def render_camera_frame(self, frame, frame_id=None):
+        display_frame = self.camera_pipeline.frame_pool.acquire()
+        np.copyto(display_frame, frame)
+        face_mesh_result = landmark_cache.cached_face_mesh_result(frame, frame_id)
+        if self.show_face_mesh and face_mesh_result is not None:
+            draw_face_landmarks(display_frame, face_mesh_result.landmark_arrays, self.camera_pipeline.overlay_density)
+        display_image = Image.fromarray(display_frame)
+        self.camera_pipeline.frame_pool.release(display_frame)
+        return display_image
+    
+    def show_display_image(self, display_image):
+        if self.current_photo is not None and (self.current_photo.width(), self.current_photo.height()) == display_image.size:
+            self.current_photo.paste(display_image)
+            return
+        self.current_photo = ImageTk.PhotoImage(image=display_image)
+        self.camera_display.config(image=self.current_photo)
     
     def prepare_capture(self):
-        self.camera_active = True
+        if self.camera_pipeline is None or self.capture_state != "idle":
+            return
         self.capture_button.config(state=tk.DISABLED)
         self.mesh_button.config(state=tk.DISABLED)
+        self.camera_pipeline.idle_scheduler.wake()
         
-        for countdown in range(3, 0, -1):
-            success, frame = self.camera.read()
-            if success:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frame = cv2.resize(frame, (640, 480))
-                
-                cv2.putText(frame, f"Smile! {countdown}...", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 0, 0), 3)
-                
-                if self.show_face_mesh:
-                    frame = self.draw_face_landmarks(frame)
-                
-                display_image = Image.fromarray(frame)
-                self.current_photo = ImageTk.PhotoImage(image=display_image)
-                self.camera_display.config(image=self.current_photo)
-                self.window.update()
-                time.sleep(1)
-        
-        success, final_frame = self.camera.read()
-        if success:
-            final_frame = cv2.cvtColor(final_frame, cv2.COLOR_BGR2RGB)
-            final_frame = cv2.resize(final_frame, (640, 480))
-            self.last_camera_frame = final_frame.copy()
-            self.process_face_image(final_frame)
-        
-        self.camera_active = False
+        self.capture_state = "countdown"
+        self.advance_capture_countdown(3)
+    
+    def advance_capture_countdown(self, countdown):
+        if countdown > 0:
+            self.camera_pipeline.overlay_text = f"Smile! {countdown}..."
+            self.window.after(1000, self.advance_capture_countdown, countdown - 1)
+            return
+        
+        self.camera_pipeline.overlay_text = None
+        self.capture_burst = []
+        self.capture_state = "burst"
+        self.capture_burst_timer = self.window.after(1000, self.finish_capture_burst)
+    
+    def collect_capture_burst(self, frame_id, frame):
+        self.capture_burst.append((frame_id, frame))
+        if len(self.capture_burst) >= self.capture_burst_size:
+            self.window.after_cancel(self.capture_burst_timer)
+            self.finish_capture_burst()
+    
+    def finish_capture_burst(self):
+        if self.capture_state != "burst":
+            return
+        
+        burst_frames, self.capture_burst = self.capture_burst, []
+        if burst_frames:
+            previous_frame = self.last_camera_frame
+            self.last_camera_frame_id, self.last_camera_frame = select_best_capture_frame(burst_frames, self.camera_pipeline.frame_rejection)
+            self.process_face_image(self.last_camera_frame, self.last_camera_frame_id)
+            unused_frames = [burst_frame for burst_frame_id, burst_frame in burst_frames]
+            if not any(previous_frame is unused_frame for unused_frame in unused_frames):
+                unused_frames.append(previous_frame)
+            for unused_frame in unused_frames:
+                self.release_camera_frame(unused_frame)
+        
+        self.capture_state = "idle"
         self.capture_button.config(state=tk.NORMAL)
         self.mesh_button.config(state=tk.NORMAL)
     
-    def process_face_image(self, frame, update_only=False):
-        image_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-        face_results = face_mesh_model.process(image_bgr)
-        
-        if face_results.multi_face_landmarks:
-            landmarks = face_results.multi_face_landmarks[0]
-            
-            self.current_skin_tone = self.analyze_skin_tone(image_bgr, landmarks)
-            self.current_face_shape = self.determine_face_structure(landmarks, image_bgr.shape)
-            self.current_eyebrows, self.current_lip_shape = self.describe_facial_features(landmarks, image_bgr.shape)
-            self.current_nose_shape = self.analyze_nose_structure(landmarks, image_bgr.shape)
+    def process_face_image(self, frame, frame_id=None):
+        face_mesh_result = landmark_cache.get_face_mesh_result(frame, frame_id)
+        
+        if face_mesh_result.multi_face_landmarks:
+            if self.result_store is not None:
+                image_hash = face_region_hash(frame, face_mesh_result.landmark_arrays)
+                cached_result = self.result_store.lookup(image_hash, lambda stored_result: self.matches_skin_tones(frame, face_mesh_result, stored_result))
+                if cached_result is not None:
+                    with performance_monitor.span("results_update"):
+                        self.show_face_analyses({int(face_id): face_analysis for face_id, face_analysis in cached_result["faces"].items()})
+                    self.show_display_image(self.render_camera_frame(frame, frame_id))
+                    return
             
-            self.suggested_highlights = self.recommend_hair_highlights(self.current_skin_tone, self.current_face_shape)
-            self.contouring_advice = self.suggest_contouring_techniques(self.current_face_shape, self.current_nose_shape, self.current_skin_tone)
-            self.recommended_haircuts = self.suggest_hairstyles(self.current_face_shape)
-            self.suggested_glasses = self.recommend_eyewear(self.current_face_shape)
-            self.recommended_earrings = self.suggest_earring_styles(self.current_face_shape)
-            self.makeup_recommendations = self.recommend_makeup_products(self.current_skin_tone)
-            self.jewelry_suggestions = self.suggest_jewelry_metals(self.current_skin_tone)
-            
-            self.update_analysis_results()
-            
-            if not update_only:
-                processed_frame = frame.copy()
-                if self.show_face_mesh:
-                    processed_frame = self.draw_face_landmarks(processed_frame)
-                
-                display_image = Image.fromarray(processed_frame)
-                self.current_photo = ImageTk.PhotoImage(image=display_image)
-                self.camera_display.config(image=self.current_photo)
+            with performance_monitor.span("analysis"):
+                face_analyses = self.face_analyzer.analyze_faces(frame, face_mesh_result.landmark_arrays)
+            if self.result_store is not None:
+                self.result_store.store(image_hash, {"faces": dict(zip(face_mesh_result.face_ids, face_analyses))})
+            with performance_monitor.span("results_update"):
+                self.show_face_analyses(dict(zip(face_mesh_result.face_ids, face_analyses)))
+            self.show_display_image(self.render_camera_frame(frame, frame_id))
         else:
-            messagebox.showwarning("No Face", "Couldn't detect a face. Please try again with better lighting.")
+            rejection = self.camera_pipeline.frame_rejection(frame_id) if self.camera_pipeline is not None else None
+            messagebox.showwarning("No Face", FRAME_GATE_FEEDBACK.get(rejection, "Couldn't detect a face. Please try again with better lighting."))
+    
+    def matches_skin_tones(self, frame, face_mesh_result, stored_result):
+        stored_analyses = list(stored_result["faces"].values())
+        if len(stored_analyses) != len(face_mesh_result.landmark_arrays):
+            return False
+        return all(
+            str(self.face_analyzer.analyze_skin_tone_with_confidence(frame, landmark_points)[0]) == stored_analysis["skin_tone"]
+            for landmark_points, stored_analysis in zip(face_mesh_result.landmark_arrays, stored_analyses)
+        )
+    
+    def show_face_analyses(self, face_analyses):
+        self.face_analyses = face_analyses
+        if self.selected_face_id not in self.face_analyses:
+            self.selected_face_id = next(iter(self.face_analyses))
+        self.face_selector.config(
+            values=[f"Face {face_id}" for face_id in self.face_analyses],
+            state="readonly" if len(self.face_analyses) > 1 else tk.DISABLED
+        )
+        self.show_face_analysis(self.selected_face_id)
+    
+    def select_face_from_list(self, event=None):
+        self.show_face_analysis(list(self.face_analyses)[self.face_selector.current()])
+    
+    def show_face_analysis(self, face_id):
+        face_analysis = self.face_analyses[face_id]
+        self.selected_face_id = face_id
+        self.face_selector.set(f"Face {face_id}")
+        
+        self.current_skin_tone = face_analysis["skin_tone"]
+        self.current_skin_tone_confidence = face_analysis["skin_tone_confidence"]
+        self.current_face_shape = face_analysis["face_shape"]
+        self.current_eyebrows = face_analysis["eyebrows"]
+        self.current_lip_shape = face_analysis["lip_shape"]
+        self.current_nose_shape = face_analysis["nose_shape"]
+        
+        self.suggested_highlights = face_analysis["highlights"]
+        self.contouring_advice = face_analysis["contouring"]
+        self.recommended_haircuts = face_analysis["haircuts"]
+        self.suggested_glasses = face_analysis["glasses"]
+        self.recommended_earrings = face_analysis["earrings"]
+        self.makeup_recommendations = face_analysis["makeup"]
+        self.jewelry_suggestions = face_analysis["jewelry"]
+        
+        self.update_analysis_results()
+    
+    def build_results_view(self):
+        if self.current_skin_tone_confidence is None:
+            skin_tone_text = self.current_skin_tone
+        else:
+            skin_tone_text = f"{self.current_skin_tone} ({self.current_skin_tone_confidence:.0%} confidence)"
+        return {
+            "skin_tone_label": skin_tone_text,
+            "face_shape_label": self.current_face_shape,
+            "nose_shape_label": self.current_nose_shape,
+            "contouring_text": bulleted_text(self.contouring_advice),
+            "highlights_text": bulleted_text(self.suggested_highlights),
+            "haircut_text": bulleted_text(self.recommended_haircuts),
+            "makeup_text": "Makeup that will complement you:\n\n" + bulleted_text(self.makeup_recommendations),
+            "glasses_text": bulleted_text(self.suggested_glasses),
+            "jewelry_text": "Best metal tones for you:\n\n" + bulleted_text(self.jewelry_suggestions)
+        }
     
     def update_analysis_results(self):
-        self.skin_tone_label.config(text=self.current_skin_tone)
-        self.face_shape_label.config(text=self.current_face_shape)
-        self.nose_shape_label.config(text=self.current_nose_shape)
-        
-        self.contouring_text.config(state=tk.NORMAL)
-        self.contouring_text.delete(1.0, tk.END)
-        for tip in self.contouring_advice:
-            self.contouring_text.insert(tk.END, f"• {tip}\n")
-        self.contouring_text.config(state=tk.DISABLED)
-        
-        self.highlights_text.config(state=tk.NORMAL)
-        self.highlights_text.delete(1.0, tk.END)
-        for highlight in self.suggested_highlights:
-            self.highlights_text.insert(tk.END, f"• {highlight}\n")
-        self.highlights_text.config(state=tk.DISABLED)
-        
-        self.haircut_text.config(state=tk.NORMAL)
-        self.haircut_text.delete(1.0, tk.END)
-        for haircut in self.recommended_haircuts:
-            self.haircut_text.insert(tk.END, f"• {haircut}\n")
-        self.haircut_text.config(state=tk.DISABLED)
-        
-        self.makeup_text.config(state=tk.NORMAL)
-        self.makeup_text.delete(1.0, tk.END)
-        self.makeup_text.insert(tk.END, "Makeup that will complement you:\n\n")
-        for tip in self.makeup_recommendations:
-            self.makeup_text.insert(tk.END, f"• {tip}\n")
-        self.makeup_text.config(state=tk.DISABLED)
-        
-        self.glasses_text.config(state=tk.NORMAL)
-        self.glasses_text.delete(1.0, tk.END)
-        for style in self.suggested_glasses:
-            self.glasses_text.insert(tk.END, f"• {style}\n")
-        self.glasses_text.config(state=tk.DISABLED)
+        self.pending_results_view = self.build_results_view()
+        if self.results_refresh_job is None:
+            self.results_refresh_job = self.window.after_idle(self.refresh_results_panel)
+    
+    def refresh_results_panel(self):
+        self.results_refresh_job = None
+        results_view, self.pending_results_view = self.pending_results_view, None
+        if results_view is None:
+            return
         
-        self.jewelry_text.config(state=tk.NORMAL)
-        self.jewelry_text.delete(1.0, tk.END)
-        self.jewelry_text.insert(tk.END, "Best metal tones for you:\n\n")
-        for metal in self.jewelry_suggestions:
-            self.jewelry_text.insert(tk.END, f"• {metal}\n")
-        self.jewelry_text.config(state=tk.DISABLED)
+        for widget_name, widget_content in results_view.items():
+            if self.displayed_results.get(widget_name) == widget_content:
+                continue
+            widget = getattr(self, widget_name)
+            if widget_name.endswith("_label"):
+                widget.config(text=widget_content)
+            else:
+                widget.config(state=tk.NORMAL)
+                widget.delete(1.0, tk.END)
+                widget.insert(tk.END, widget_content)
+                widget.config(state=tk.DISABLED)
+            self.displayed_results[widget_name] = widget_content
     
     def close_application(self):
+        if self.camera_pipeline is not None:
+            self.camera_pipeline.stop()
+            if self.idle_after_frames or self.pause_when_minimized:
+                print(self.camera_pipeline.idle_scheduler.describe(), file=sys.stderr)
         if self.camera is not None:
             self.camera.release()
+        if self.result_store is not None:
+            self.result_store.close()
         self.window.destroy()
 
-    def analyze_skin_tone(self, image, face_landmarks):
-        height, width = image.shape[:2]
-        
-        sampling_points = [1, 4, 33, 94, 152, 263, 296, 168, 197, 2, 326]
-        
-        sampled_coordinates = []
-        for point in sampling_points:
-            landmark = face_landmarks.landmark[point]
-            x_pos, y_pos = int(landmark.x * width), int(landmark.y * height)
-            if 0 <= x_pos < width and 0 <= y_pos < height:
-                sampled_coordinates.append((x_pos, y_pos))
-        
-        color_samples = [image[y, x] for x, y in sampled_coordinates]
-        
-        if not color_samples:
-            return "could not determine"
-        
-        average_color = np.mean(color_samples, axis=0)
-        return self.determine_undertone(average_color)
+ANALYSIS_PIPELINE_REVISION = 1
+PERCEPTUAL_HASH_SIZE = 16
+PERCEPTUAL_HASH_BANDS = 16
+FACE_HASH_GRID = 8
+RESULT_STORE_SCHEMA_VERSION = 2
 
-    def determine_undertone(self, color_values):
-        blue, green, red = color_values
-        
-        red_blue_diff = red - blue
-        green_blue_diff = green - blue
-        
-        if red_blue_diff > 15 and green_blue_diff > 15:
-            if red > green * 1.1:
-                return "warm (golden/peachy)"
-            elif green > red * 1.1:
-                return "neutral (olive)"
-            else:
-                return "neutral (balanced)"
-        elif red_blue_diff < -10:
-            return "cool (pinkish)"
-        else:
-            return "neutral (balanced)"
+def perceptual_hash(image):
+    thumbnail = cv2.resize(image, (PERCEPTUAL_HASH_SIZE + 1, PERCEPTUAL_HASH_SIZE), interpolation=cv2.INTER_AREA)
+    brightness = thumbnail.astype(np.float32).mean(axis=2) if thumbnail.ndim == 3 else thumbnail.astype(np.float32)
+    return np.packbits(brightness[:, 1:] > brightness[:, :-1]).tobytes()
 
-    def determine_face_structure(self, landmarks, image_dimensions):
-        height, width = image_dimensions[:2]
-        landmark_points = [(int(landmark.x * width), int(landmark.y * height)) for landmark in landmarks.landmark]
-        
-        jaw_width = abs(landmark_points[454][0] - landmark_points[234][0])
-        forehead_width = abs(landmark_points[21][0] - landmark_points[251][0])
-        face_height = abs(landmark_points[10][1] - landmark_points[152][1])
-        cheek_width = abs(landmark_points[454][0] - landmark_points[234][0])
-        
-        jaw_to_forehead = jaw_width / forehead_width
-        height_to_width = face_height / cheek_width
+def face_region_hash(image, landmark_arrays):
+    face_points = np.concatenate(landmark_arrays)[:, :2]
+    lowest_point, highest_point = face_points.min(axis=0), face_points.max(axis=0)
+    half_size = max(FACE_HASH_GRID, round(np.max(highest_point - lowest_point) * 0.625 / FACE_HASH_GRID) * FACE_HASH_GRID)
+    center = np.round((lowest_point + highest_point) / 2 / FACE_HASH_GRID).astype(int) * FACE_HASH_GRID
+    left, top = np.maximum(center - half_size, 0)
+    right, bottom = center + half_size
+    face_region = cv2.GaussianBlur(image[top:bottom, left:right], (0, 0), half_size / PERCEPTUAL_HASH_SIZE)
+    return perceptual_hash(face_region)
+
+def analysis_pipeline_digest(rules_path=RECOMMENDATION_RULES_PATH):
+    version_digest = hashlib.blake2b(digest_size=8)
+    pipeline_parts = (
+        SkinUndertone, FaceShape, NoseShape, FaceAnalyzer, RecommendationEngine, FaceMeshResult, RegionOfInterestSelector,
+        create_face_mesh_model, landmarks_to_array, landmark_rows, masked_median, detect_bgr_landmarks, analyze_face_mesh_result, fit_to_frame_size,
+        perceptual_hash, face_region_hash
+    )
+    for pipeline_part in pipeline_parts:
+        version_digest.update(inspect.getsource(pipeline_part).encode())
+    version_digest.update(repr(SKIN_SAMPLING_REGIONS).encode())
+    with open(rules_path, "rb") as rules_file:
+        version_digest.update(rules_file.read())
+    try:
+        version_digest.update(importlib.metadata.version("mediapipe").encode())
+    except importlib.metadata.PackageNotFoundError:
+        pass
+    return f"{ANALYSIS_PIPELINE_REVISION}-{version_digest.hexdigest()}"
+
+def analysis_pipeline_version(output_format, recommendation_seed=None, max_num_faces=1):
+    return f"{analysis_pipeline_digest()}-{output_format}-faces{max_num_faces}-seed{recommendation_seed}"
+
+class AnalysisResultStore:
+    def __init__(self, path, pipeline_version, max_entries=10000, max_distance=10):
+        self.path = path
+        self.pipeline_version = pipeline_version
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        with self.connection:
+            if self.connection.execute("PRAGMA user_version").fetchone()[0] != RESULT_STORE_SCHEMA_VERSION:
+                self.connection.execute("DROP TABLE IF EXISTS result_bands")
+                self.connection.execute("DROP TABLE IF EXISTS results")
+                self.connection.execute(f"PRAGMA user_version = {RESULT_STORE_SCHEMA_VERSION}")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (id INTEGER PRIMARY KEY, pipeline_version TEXT NOT NULL, "
+                "image_hash BLOB NOT NULL, result TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS result_bands (band_key INTEGER NOT NULL, "
+                "result_id INTEGER NOT NULL REFERENCES results (id) ON DELETE CASCADE)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS result_bands_key ON result_bands (band_key)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS result_bands_result ON result_bands (result_id)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+
+    def hash_bands(self, image_hash):
+        band_values = np.frombuffer(image_hash, dtype=">u2").astype(np.int64)
+        band_bits = 8 * len(image_hash) // PERCEPTUAL_HASH_BANDS
+        return ((np.arange(PERCEPTUAL_HASH_BANDS) << band_bits) | band_values).tolist()
+
+    def lookup(self, image_hash, accept=None):
+        candidates = self.connection.execute(
+            f"SELECT id, image_hash, result FROM results WHERE pipeline_version = ? AND id IN "
+            f"(SELECT result_id FROM result_bands WHERE band_key IN ({', '.join('?' * PERCEPTUAL_HASH_BANDS)}))",
+            (self.pipeline_version, *self.hash_bands(image_hash))
+        ).fetchall()
+        if not candidates:
+            self.misses += 1
+            return None
+        
+        hash_bits = np.unpackbits(np.frombuffer(image_hash, dtype=np.uint8))
+        candidate_bits = np.unpackbits(np.frombuffer(b"".join(candidate[1] for candidate in candidates), dtype=np.uint8)).reshape(len(candidates), -1)
+        distances = np.count_nonzero(candidate_bits != hash_bits, axis=1)
+        for closest in np.argsort(distances, kind="stable"):
+            if distances[closest] > self.max_distance:
+                break
+            stored_result = json.loads(candidates[closest][2])
+            if accept is not None and not accept(stored_result):
+                continue
+            
+            self.hits += 1
+            with self.connection:
+                self.connection.execute("UPDATE results SET last_used = ? WHERE id = ?", (time.time(), candidates[closest][0]))
+            return stored_result
         
-        if height_to_width > 1.5:
-            if jaw_to_forehead < 0.85:
-                return "heart (wider forehead, narrow chin)"
-            elif 0.85 <= jaw_to_forehead <= 1.15:
-                return "oval (balanced proportions)"
+        self.misses += 1
+        return None
+
+    def store(self, image_hash, result):
+        with self.connection:
+            result_id = self.connection.execute(
+                "INSERT INTO results (pipeline_version, image_hash, result, last_used) VALUES (?, ?, ?, ?)",
+                (self.pipeline_version, image_hash, json.dumps(result), time.time())
+            ).lastrowid
+            self.connection.executemany(
+                "INSERT INTO result_bands (band_key, result_id) VALUES (?, ?)", [(band_key, result_id) for band_key in self.hash_bands(image_hash)]
+            )
+            entry_count = self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if entry_count > self.max_entries:
+                self.connection.execute(
+                    "DELETE FROM results WHERE id IN (SELECT id FROM results ORDER BY last_used LIMIT ?)",
+                    (entry_count - int(self.max_entries * 0.9),)
+                )
+
+    def remove_stale_results(self):
+        with self.connection:
+            return self.connection.execute(
+                "DELETE FROM results WHERE pipeline_version NOT LIKE ?", (analysis_pipeline_digest() + "-%",)
+            ).rowcount
+
+    def clear(self):
+        with self.connection:
+            return self.connection.execute("DELETE FROM results").rowcount
+
+    def describe(self):
+        version_counts = self.connection.execute(
+            "SELECT pipeline_version, COUNT(*) FROM results GROUP BY pipeline_version ORDER BY COUNT(*) DESC"
+        ).fetchall()
+        current_digest = analysis_pipeline_digest()
+        return [(pipeline_version, entry_count, pipeline_version.startswith(current_digest + "-")) for pipeline_version, entry_count in version_counts]
+
+    def close(self):
+        self.connection.close()
+
+batch_face_mesh_model = None
+batch_face_analyzer = None
+batch_max_faces = 1
+batch_result_store = None
+
+def initialize_batch_worker(recommendation_seed=None, max_num_faces=1, result_store_path=None, pipeline_version=None):
+    global batch_face_mesh_model, batch_face_analyzer, batch_max_faces, batch_result_store
+    cv2.setNumThreads(1)
+    batch_max_faces = max_num_faces
+    batch_face_mesh_model = create_face_mesh_model(static_image_mode=True, max_num_faces=max_num_faces)
+    batch_face_analyzer = FaceAnalyzer(recommendation_seed=recommendation_seed)
+    if result_store_path is not None:
+        batch_result_store = AnalysisResultStore(result_store_path, pipeline_version)
+
+def fit_to_frame_size(image, frame_size=CAMERA_FRAME_SIZE):
+    height, width = image.shape[:2]
+    scale = min(frame_size[0] / width, frame_size[1] / height)
+    if scale >= 1:
+        return image
+    return cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+def detect_bgr_landmarks(face_mesh, image_bgr, region_selector=None):
+    if region_selector is None:
+        face_results = face_mesh.process(cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB))
+        return FaceMeshResult(face_results.multi_face_landmarks, image_bgr.shape)
+    return region_selector.detect(
+        image_bgr, lambda region_image: face_mesh.process(cv2.cvtColor(region_image, cv2.COLOR_BGR2RGB)).multi_face_landmarks
+    )
+
+def analyze_face_mesh_result(face_analyzer, image_bgr, face_mesh_result, multi_face=False):
+    if not face_mesh_result.landmark_arrays:
+        return {"error": "no face detected"}
+    if not multi_face:
+        return face_analyzer.analyze_face(image_bgr, face_mesh_result.landmark_arrays[0])
+    
+    face_analyses = face_analyzer.analyze_faces(image_bgr, face_mesh_result.landmark_arrays)
+    return {"faces": {str(face_id): face_analysis for face_id, face_analysis in zip(face_mesh_result.face_ids, face_analyses)}}
+
+def analyze_bgr_image(face_mesh, face_analyzer, image_bgr, region_selector=None, multi_face=False):
+    image_bgr = fit_to_frame_size(image_bgr)
+    return analyze_face_mesh_result(face_analyzer, image_bgr, detect_bgr_landmarks(face_mesh, image_bgr, region_selector), multi_face)
+
+def analyze_image_file(image_path):
+    image_bgr = cv2.imread(image_path)
+    if image_bgr is None:
+        return {"path": image_path, "error": "could not read image"}
+    
+    image_result = {"path": image_path}
+    if batch_result_store is None:
+        image_result.update(analyze_bgr_image(batch_face_mesh_model, batch_face_analyzer, image_bgr, multi_face=batch_max_faces > 1))
+        return image_result
+    
+    image_hash = perceptual_hash(image_bgr)
+    cached_result = batch_result_store.lookup(image_hash)
+    if cached_result is not None:
+        image_result.update(cached_result, cached=True)
+        return image_result
+    analysis_result = analyze_bgr_image(batch_face_mesh_model, batch_face_analyzer, image_bgr, multi_face=batch_max_faces > 1)
+    batch_result_store.store(image_hash, analysis_result)
+    image_result.update(analysis_result)
+    return image_result
+
+def find_image_files(directory, recursive=False):
+    image_paths = []
+    for folder, subfolders, file_names in os.walk(directory):
+        image_paths.extend(
+            os.path.join(folder, file_name) for file_name in file_names
+            if file_name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not recursive:
+            break
+    return sorted(image_paths)
+
+def run_batch_analysis(directory, worker_count, output_file, recursive=False, recommendation_seed=None, max_num_faces=1, result_store_path=None):
+    image_paths = find_image_files(directory, recursive)
+    start_time = time.perf_counter()
+    analyzed_count = 0
+    failed_count = 0
+    cached_count = 0
+    
+    worker_options = (recommendation_seed, max_num_faces)
+    if result_store_path is not None:
+        pipeline_version = analysis_pipeline_version("batch", recommendation_seed, max_num_faces)
+        AnalysisResultStore(result_store_path, pipeline_version).close()
+        worker_options += (result_store_path, pipeline_version)
+    if worker_count > 1:
+        worker_pool = multiprocessing.Pool(worker_count, initializer=initialize_batch_worker, initargs=worker_options)
+        image_results = worker_pool.imap_unordered(analyze_image_file, image_paths, chunksize=4)
+    else:
+        worker_pool = None
+        initialize_batch_worker(*worker_options)
+        image_results = map(analyze_image_file, image_paths)
+    
+    try:
+        for image_result in image_results:
+            output_file.write(json.dumps(image_result) + "\n")
+            output_file.flush()
+            analyzed_count += 1
+            if "error" in image_result:
+                failed_count += 1
+            if image_result.get("cached"):
+                cached_count += 1
+    finally:
+        if worker_pool is not None:
+            worker_pool.close()
+            worker_pool.join()
+    
+    elapsed_seconds = time.perf_counter() - start_time
+    print(f"Analyzed {analyzed_count} images ({failed_count} failed) in {elapsed_seconds:.1f}s "
+          f"with {worker_count} worker(s)", file=sys.stderr)
+    if result_store_path is not None:
+        print(f"Reused {cached_count} stored result(s) from {result_store_path}", file=sys.stderr)
+
+def run_stream_analysis(source, output_file, stride=1, adaptive=False, speed=1.0, track_landmarks=False, crop_to_face=True, recommendation_seed=None, max_num_faces=1, live=False,
+                        quality_gate=None, recording_path=None):
+    frame_source = FrameSource(source)
+    if not frame_source.open():
+        sys.exit(f"Could not open video source: {source}")
+    
+    stream_face_mesh = create_face_mesh_model(static_image_mode=False, max_num_faces=max_num_faces)
+    face_analyzer = FaceAnalyzer(recommendation_seed=recommendation_seed)
+    region_selector = RegionOfInterestSelector() if crop_to_face else None
+    face_tracks = FaceTrackMatcher()
+    detect_stream_landmarks = lambda image_bgr, frame_id: face_tracks.label(detect_bgr_landmarks(stream_face_mesh, image_bgr, region_selector))
+    landmark_tracker = LandmarkTracker(detect_stream_landmarks) if track_landmarks else None
+    live_analysis = LiveAnalysis(face_analyzer) if live else None
+    landmark_recorder = LandmarkRecorder(recording_path, face_analyzer, max_num_faces) if recording_path is not None else None
+    start_time = time.perf_counter()
+    analyzed_count = 0
+    published_count = 0
+    last_timestamp = 0.0
+    
+    try:
+        for frame_id, timestamp, frame in frame_source.frames(stride, adaptive, speed):
+            frame_result = {"frame": frame_id, "timestamp": round(timestamp, 3)}
+            image_bgr = fit_to_frame_size(frame)
+            rejection = quality_gate.check(image_bgr) if quality_gate is not None else None
+            if rejection is not None:
+                if live_analysis is None:
+                    frame_result["rejected"] = rejection
+                    output_file.write(json.dumps(frame_result) + "\n")
+                    output_file.flush()
+                continue
+            if landmark_tracker is None:
+                face_mesh_result = detect_stream_landmarks(image_bgr, frame_id)
             else:
-                return "oblong (long and narrow)"
-        elif height_to_width <= 1.5:
-            if jaw_to_forehead > 1.1:
-                return "square (strong jawline)"
-            elif abs(cheek_width - jaw_width) < 0.1 * cheek_width:
-                return "round (similar width and length)"
+                face_mesh_result, smoothed_result = landmark_tracker.track(image_bgr, frame_id)
+            analyzed_count += 1
+            last_timestamp = timestamp
+            if landmark_recorder is not None:
+                landmark_recorder.record(frame_id, timestamp, image_bgr, face_mesh_result)
+            
+            if live_analysis is None:
+                frame_result.update(analyze_face_mesh_result(face_analyzer, image_bgr, face_mesh_result, max_num_faces > 1))
             else:
-                return "diamond (wide cheekbones)"
-        return "oval"
+                published_analyses = live_analysis.update(image_bgr, face_mesh_result)
+                if not published_analyses:
+                    continue
+                if max_num_faces > 1:
+                    frame_result["faces"] = {str(face_id): face_analysis for face_id, face_analysis in published_analyses.items()}
+                else:
+                    frame_result.update(next(iter(published_analyses.values())))
+                published_count += 1
+            output_file.write(json.dumps(frame_result) + "\n")
+            output_file.flush()
+    finally:
+        frame_source.release()
+        stream_face_mesh.close()
+        if landmark_recorder is not None:
+            landmark_recorder.close()
+    
+    elapsed_seconds = time.perf_counter() - start_time
+    print(f"Analyzed {analyzed_count} frames, skipped {frame_source.skipped_frames}, "
+          f"covered {last_timestamp:.1f}s of video in {elapsed_seconds:.1f}s", file=sys.stderr)
+    if live_analysis is not None:
+        print(f"Live analysis published {published_count} stable result(s)", file=sys.stderr)
+    if quality_gate is not None:
+        print(f"Quality gate: {quality_gate.describe_rejections()}", file=sys.stderr)
+    if landmark_recorder is not None:
+        print(f"Recorded {landmark_recorder.records_written} face(s) from {landmark_recorder.frames_written} frames to {recording_path}", file=sys.stderr)
+    if region_selector is not None:
+        print(f"Face cropping cut pixels sent to Face Mesh by {region_selector.pixel_reduction:.1f}x", file=sys.stderr)
+    if landmark_tracker is not None:
+        print(f"Tracking ran Face Mesh on {landmark_tracker.inferences_run} frames and skipped "
+              f"{landmark_tracker.inferences_skipped} ({landmark_tracker.skip_ratio:.0%})", file=sys.stderr)
 
-    def analyze_nose_structure(self, landmarks, image_dimensions):
-        height, width = image_dimensions[:2]
-        landmark_points = [(int(landmark.x * width), int(landmark.y * height)) for landmark in landmarks.landmark]
-        
-        face_width = abs(landmark_points[454][0] - landmark_points[234][0])
-        face_height = abs(landmark_points[10][1] - landmark_points[152][1])
-        
-        nose_width = abs(landmark_points[129][0] - landmark_points[358][0])
-        nose_length = abs(landmark_points[1][1] - landmark_points[4][1])
-        bridge_width = abs(landmark_points[44][0] - landmark_points[276][0])
-        
-        width_proportion = nose_width / face_width
-        length_proportion = nose_length / face_height
-        bridge_proportion = bridge_width / nose_width
-        
-        if width_proportion > 0.25:
-            if bridge_proportion < 0.3:
-                return "wide with narrow bridge"
-            else:
-                return "wide (broad nostrils)"
-        elif width_proportion < 0.15:
-            return "narrow (slim)"
-        elif length_proportion > 0.3:
-            return "long (prominent)"
-        elif bridge_proportion < 0.25:
-            return "thin (delicate bridge)"
-        elif length_proportion < 0.2:
-            return "short (button-like)"
-        else:
-            return "balanced (classic proportions)"
+RECORDING_MAGIC = b"FACEREC1"
+RECORDING_FORMAT_VERSION = 2
+RECORDING_NO_FACE_ID = -1
+REPLAY_CHUNK_RECORDS = 2048
+RECORDING_HEADER_DTYPE = np.dtype([
+    ("magic", "S8"), ("format_version", "<u4"), ("landmark_count", "<u4"),
+    ("skin_sample_count", "<u4"), ("max_faces", "<u4"), ("reserved", "V40")
+])
 
-    def describe_facial_features(self, landmarks, image_dimensions):
-        height, width = image_dimensions[:2]
-        landmark_points = [(int(landmark.x * width), int(landmark.y * height)) for landmark in landmarks.landmark]
+def landmark_record_dtype(landmark_count, skin_sample_count):
+    return np.dtype([
+        ("frame_id", "<i8"), ("timestamp", "<f8"), ("face_id", "<i4"), ("skin_sample_count", "<u4"),
+        ("landmarks", "<f4", (landmark_count, 3)),
+        ("skin_pixels", "u1", (skin_sample_count, 3)),
+        ("skin_region_ids", "u1", (skin_sample_count,))
+    ])
 
-        eyebrow_thickness = abs(landmark_points[70][1] - landmark_points[105][1])
-        eyebrow_style = "arched" if eyebrow_thickness < 10 else "straight"
+class LandmarkRecorder:
+    def __init__(self, path, face_analyzer, max_num_faces=1, skin_sample_count=512):
+        self.path = path
+        self.face_analyzer = face_analyzer
+        self.max_num_faces = max_num_faces
+        self.skin_sample_count = skin_sample_count
+        self.recording_file = open(path, "wb")
+        self.face_record = None
+        self.empty_record = None
+        self.pending_empty_frames = []
+        self.records_written = 0
+        self.frames_written = 0
 
-        lip_height = abs(landmark_points[13][1] - landmark_points[14][1])
-        lip_width = abs(landmark_points[78][0] - landmark_points[308][0])
-        lip_ratio = lip_width / max(lip_height, 1)
+    def write_header(self, landmark_count):
+        header = np.zeros(1, dtype=RECORDING_HEADER_DTYPE)
+        header["magic"] = RECORDING_MAGIC
+        header["format_version"] = RECORDING_FORMAT_VERSION
+        header["landmark_count"] = landmark_count
+        header["skin_sample_count"] = self.skin_sample_count
+        header["max_faces"] = self.max_num_faces
+        self.recording_file.write(header.tobytes())
+        self.face_record = np.zeros(1, dtype=landmark_record_dtype(landmark_count, self.skin_sample_count))
+        self.empty_record = np.zeros(1, dtype=self.face_record.dtype)
+        self.empty_record["face_id"] = RECORDING_NO_FACE_ID
+        for frame_id, timestamp in self.pending_empty_frames:
+            self.record_empty_frame(frame_id, timestamp)
+        self.pending_empty_frames = []
 
-        if lip_ratio < 1.2:
-            lip_style = "round"
-        elif lip_height > 16:
-            lip_style = "full"
-        elif lip_height < 8:
-            lip_style = "thin"
-        elif landmark_points[13][1] < landmark_points[14][1] and lip_width > 90:
-            lip_style = "bunny"
-        elif landmark_points[14][1] - landmark_points[13][1] > 12 and lip_width > 95:
-            lip_style = "heart"
-        elif abs(landmark_points[78][0] - landmark_points[308][0]) > 120 and abs(landmark_points[13][1] - landmark_points[14][1]) < 10:
-            lip_style = "diamond"
+    def record_empty_frame(self, frame_id, timestamp):
+        if self.empty_record is None:
+            self.pending_empty_frames.append((frame_id, timestamp))
+            return
+        self.empty_record["frame_id"] = frame_id
+        self.empty_record["timestamp"] = timestamp
+        self.recording_file.write(self.empty_record.tobytes())
+
+    def record(self, frame_id, timestamp, image_bgr, face_mesh_result):
+        self.frames_written += 1
+        if not face_mesh_result.landmark_arrays:
+            self.record_empty_frame(frame_id, timestamp)
+            return
+        for face_id, landmark_points in zip(face_mesh_result.face_ids, face_mesh_result.landmark_arrays):
+            if self.face_record is None:
+                self.write_header(len(landmark_points))
+            skin_pixels, region_ids = self.face_analyzer.sample_skin_pixels(image_bgr, landmark_points)
+            if len(skin_pixels) > self.skin_sample_count:
+                kept_pixels = np.linspace(0, len(skin_pixels) - 1, self.skin_sample_count).astype(np.intp)
+                skin_pixels, region_ids = skin_pixels[kept_pixels], region_ids[kept_pixels]
+            
+            face_record = self.face_record[0]
+            face_record["frame_id"] = frame_id
+            face_record["timestamp"] = timestamp
+            face_record["face_id"] = face_id
+            face_record["skin_sample_count"] = len(skin_pixels)
+            face_record["landmarks"] = landmark_points
+            face_record["skin_pixels"][:len(skin_pixels)] = skin_pixels
+            face_record["skin_pixels"][len(skin_pixels):] = 0
+            face_record["skin_region_ids"][:len(region_ids)] = region_ids
+            face_record["skin_region_ids"][len(region_ids):] = 0
+            self.recording_file.write(self.face_record.tobytes())
+            self.records_written += 1
+
+    def close(self):
+        if self.face_record is None:
+            self.write_header(0)
+        self.recording_file.close()
+
+class LandmarkRecording:
+    def __init__(self, path):
+        header = np.fromfile(path, dtype=RECORDING_HEADER_DTYPE, count=1)
+        if len(header) != 1 or header["magic"][0] != RECORDING_MAGIC:
+            raise ValueError(f"{path} is not a landmark recording")
+        if header["format_version"][0] != RECORDING_FORMAT_VERSION:
+            raise ValueError(f"{path} uses recording format {header['format_version'][0]}, expected {RECORDING_FORMAT_VERSION}")
+        
+        self.path = path
+        self.max_num_faces = int(header["max_faces"][0])
+        self.record_dtype = landmark_record_dtype(int(header["landmark_count"][0]), int(header["skin_sample_count"][0]))
+        record_count = (os.path.getsize(path) - RECORDING_HEADER_DTYPE.itemsize) // self.record_dtype.itemsize
+        if record_count:
+            self.records = np.memmap(path, dtype=self.record_dtype, mode="r", offset=RECORDING_HEADER_DTYPE.itemsize, shape=(record_count,))
         else:
-            lip_style = "balanced"
+            self.records = np.zeros(0, dtype=self.record_dtype)
 
-        return eyebrow_style, lip_style
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def face_count(self):
+        return int(np.count_nonzero(self.records["face_id"] != RECORDING_NO_FACE_ID))
+
+def replay_landmark_recording(path, output_file, recommendation_seed=None):
+    try:
+        recording = LandmarkRecording(path)
+    except (OSError, ValueError) as error:
+        sys.exit(f"Could not read recording: {error}")
+    
+    start_time = time.perf_counter()
+    face_analyzer = FaceAnalyzer(channel_order="bgr", recommendation_seed=recommendation_seed)
+    frame_result = None
+    frame_count = 0
+    for chunk_start in range(0, len(recording), REPLAY_CHUNK_RECORDS):
+        records = recording.records[chunk_start:chunk_start + REPLAY_CHUNK_RECORDS]
+        face_records = records[records["face_id"] != RECORDING_NO_FACE_ID]
+        face_measurements = iter(())
+        if len(face_records):
+            all_landmark_points = face_records["landmarks"]
+            face_measurements = zip(
+                zip(*face_analyzer.measure_face_structure(all_landmark_points)),
+                zip(*face_analyzer.measure_nose_structure(all_landmark_points)),
+                zip(*face_analyzer.measure_facial_features(all_landmark_points)),
+                face_analyzer.classify_skin_samples(face_records["skin_pixels"], face_records["skin_region_ids"], face_records["skin_sample_count"])
+            )
+        for face_record in records:
+            frame_id = int(face_record["frame_id"])
+            new_frame = frame_result is None or frame_result["frame"] != frame_id
+            if new_frame:
+                if frame_result is not None:
+                    output_file.write(json.dumps(frame_result) + "\n")
+                frame_result = {"frame": frame_id, "timestamp": round(float(face_record["timestamp"]), 3)}
+                frame_count += 1
+            if face_record["face_id"] == RECORDING_NO_FACE_ID:
+                frame_result["error"] = "no face detected"
+                continue
+            face_measurement = next(face_measurements)
+            if not new_frame and recording.max_num_faces == 1:
+                continue
+            
+            face_analysis = replay_face_analysis(face_analyzer, *face_measurement)
+            if recording.max_num_faces > 1:
+                frame_result.setdefault("faces", {})[str(face_record["face_id"])] = face_analysis
+            else:
+                frame_result.update(face_analysis)
+    if frame_result is not None:
+        output_file.write(json.dumps(frame_result) + "\n")
+    
+    elapsed_seconds = time.perf_counter() - start_time
+    print(f"Replayed {recording.face_count} face(s) from {frame_count} frames in {elapsed_seconds:.2f}s "
+          f"({recording.face_count / max(elapsed_seconds, 1e-9):.0f} faces/s)", file=sys.stderr)
+
+def replay_face_analysis(face_analyzer, face_structure, nose_structure, facial_features, skin_classification):
+    skin_tone, skin_tone_confidence = skin_classification
+    face_shape = face_analyzer.classify_face_structure(*face_structure)
+    nose_shape = face_analyzer.classify_nose_structure(*nose_structure)
+    eyebrows, lip_shape = face_analyzer.classify_facial_features(*facial_features)
+    return {
+        "skin_tone": skin_tone,
+        "skin_tone_confidence": skin_tone_confidence,
+        "face_shape": face_shape,
+        "nose_shape": nose_shape,
+        "eyebrows": eyebrows,
+        "lip_shape": lip_shape,
+        **face_analyzer.recommendation_engine.recommend(skin_tone, face_shape, nose_shape)
+    }
+
+HTTP_STATUS_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 422: "Unprocessable Entity", 500: "Internal Server Error", 503: "Service Unavailable"
+}
+
+class HttpRequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+async def read_http_request(reader, max_body_bytes):
+    try:
+        header_block = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise HttpRequestError(400, "request headers too large")
+    
+    request_line, *header_lines = header_block.decode("latin-1").split("\r\n")
+    try:
+        method, path, http_version = request_line.split(" ")
+    except ValueError:
+        raise HttpRequestError(400, "malformed request line")
+    headers = {}
+    for header_line in header_lines:
+        if ":" in header_line:
+            header_name, header_value = header_line.split(":", 1)
+            headers[header_name.strip().lower()] = header_value.strip()
+    
+    try:
+        content_length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise HttpRequestError(400, "invalid Content-Length header")
+    if content_length < 0:
+        raise HttpRequestError(400, "invalid Content-Length header")
+    if content_length > max_body_bytes:
+        raise HttpRequestError(413, f"uploads are limited to {max_body_bytes} bytes")
+    body = await reader.readexactly(content_length) if content_length else b""
+    keep_alive = headers.get("connection", "").lower() != "close" and http_version == "HTTP/1.1"
+    return method, path.split("?", 1)[0], body, keep_alive
 
-    def suggest_contouring_techniques(self, face_shape, nose_shape, skin_tone):
-        contour_suggestions = []
-        
-        if "round" in face_shape:
-            contour_suggestions.append("Apply contour along temples and under cheekbones to elongate face")
-            contour_suggestions.append("Focus on creating angles with your contour")
-        elif "square" in face_shape:
-            contour_suggestions.append("Soften jawline with contour along the edges")
-            contour_suggestions.append("Round out the forehead corners slightly")
-        elif "heart" in face_shape:
-            contour_suggestions.append("Contour temples to balance wider forehead")
-            contour_suggestions.append("Add slight contour to chin point to soften")
-        elif "oval" in face_shape:
-            contour_suggestions.append("Light contouring just to enhance natural structure")
-        elif "oblong" in face_shape:
-            contour_suggestions.append("Contour forehead and chin to visually shorten face")
-        elif "diamond" in face_shape:
-            contour_suggestions.append("Contour cheekbone peaks to soften angles")
-        
-        if "wide" in nose_shape:
-            contour_suggestions.append("Apply contour along sides of nose to create slimming effect")
-        elif "narrow" in nose_shape:
-            contour_suggestions.append("Use subtle highlight down nose bridge to enhance")
-        elif "long" in nose_shape:
-            contour_suggestions.append("Apply contour at nose tip to visually shorten")
-        elif "short" in nose_shape:
-            contour_suggestions.append("Highlight down nose bridge to elongate appearance")
-        elif "thin" in nose_shape:
-            contour_suggestions.append("Minimal nose contouring needed")
-        
-        if "warm" in skin_tone:
-            contour_suggestions.append("Use warm-toned contour shades (taupe, caramel)")
-        elif "cool" in skin_tone:
-            contour_suggestions.append("Use cool-toned contour shades (ash brown, grey-brown)")
+async def write_http_response(writer, status, payload, extra_headers=(), keep_alive=True):
+    body = json.dumps(payload).encode("utf-8")
+    header_lines = [
+        f"HTTP/1.1 {status} {HTTP_STATUS_REASONS.get(status, '')}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}"
+    ]
+    header_lines.extend(f"{header_name}: {header_value}" for header_name, header_value in extra_headers)
+    writer.write(("\r\n".join(header_lines) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+def initialize_service_worker(recommendation_seed=None, max_num_faces=1):
+    initialize_batch_worker(recommendation_seed, max_num_faces)
+    batch_face_mesh_model.process(np.zeros((CAMERA_FRAME_SIZE[1], CAMERA_FRAME_SIZE[0], 3), dtype=np.uint8))
+
+def warm_up_service_worker():
+    time.sleep(0.1)
+    return os.getpid()
+
+def analyze_encoded_images(encoded_images):
+    batch_results = []
+    for encoded_image in encoded_images:
+        start_time = time.perf_counter()
+        image_bgr = cv2.imdecode(np.frombuffer(encoded_image, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image_bgr is None:
+            image_result = {"error": "could not decode image"}
         else:
-            contour_suggestions.append("Use neutral contour shades (mocha, soft brown)")
-        
-        return contour_suggestions
+            image_result = analyze_bgr_image(batch_face_mesh_model, batch_face_analyzer, image_bgr, multi_face=batch_max_faces > 1)
+        batch_results.append((image_result, time.perf_counter() - start_time))
+    return batch_results
 
-    def recommend_hair_highlights(self, skin_tone, face_shape):
-        warm_colors = ['caramel', 'honey blonde', 'golden brown', 'coffee brown', 'rust']
-        cool_colors = ['ash blonde', 'burgundy', 'cool brown', 'plum', 'wine red']
-        neutral_colors = ['chocolate brown', 'auburn', 'chestnut', 'bronze']
+class ServiceMetrics:
+    def __init__(self, latency_window=2048):
+        self.started_at = time.time()
+        self.requests_completed = 0
+        self.requests_failed = 0
+        self.requests_rejected = 0
+        self.batches_dispatched = 0
+        self.batched_requests = 0
+        self.largest_batch = 0
+        self.request_latencies = deque(maxlen=latency_window)
+        self.queue_latencies = deque(maxlen=latency_window)
 
-        if "warm" in skin_tone:
-            base_colors = warm_colors
-        elif "cool" in skin_tone:
-            base_colors = cool_colors
+    def record_batch(self, batch_size):
+        self.batches_dispatched += 1
+        self.batched_requests += batch_size
+        self.largest_batch = max(self.largest_batch, batch_size)
+
+    def record_request(self, succeeded, queue_seconds, total_seconds):
+        if succeeded:
+            self.requests_completed += 1
         else:
-            base_colors = neutral_colors
-
-        if "round" in face_shape or "square" in face_shape:
-            base_colors.extend(['face-framing highlights', 'dimensional coloring'])
-        elif "long" in face_shape:
-            base_colors.extend(['horizontal emphasis colors', 'soft balayage'])
-
-        return random.sample(base_colors, min(4, len(base_colors)))
-
-    def suggest_hairstyles(self, face_shape):
-        hairstyle_map = {
-            "oval": ["long layers", "wavy bob", "side-swept bangs", "face-framing layers"],
-            "round": ["long straight", "layered lob", "pixie cut", "asymmetrical bob"],
-            "heart": ["chin-length bob", "deep side part", "fringe", "textured crop"],
-            "square": ["soft curls", "feathered layers", "textured bob", "tapered cut"],
-            "oblong": ["blunt bangs", "chin-length bob", "curtain bangs", "voluminous curls"],
-            "diamond": ["side-parted styles", "long layers", "soft bangs", "shoulder-length cuts"]
-        }
-        
-        for shape in hairstyle_map:
-            if shape in face_shape.lower():
-                return hairstyle_map[shape]
-        
-        return hairstyle_map["oval"]
+            self.requests_failed += 1
+        self.queue_latencies.append(queue_seconds)
+        self.request_latencies.append(total_seconds)
 
-    def recommend_eyewear(self, face_shape):
-        glasses_styles = {
-            "oval": ["square frames", "rectangle frames", "aviators"],
-            "round": ["cat-eye", "angular frames", "geometric frames"],
-            "heart": ["bottom-heavy frames", "rimless frames", "lightweight metal frames"],
-            "square": ["round frames", "oval frames", "browline glasses"],
-            "oblong": ["oversized frames", "decorative temples", "low bridge designs"],
-            "diamond": ["oval frames", "semi-rimless", "light-colored frames"]
-        }
-        
-        for shape in glasses_styles:
-            if shape in face_shape.lower():
-                return glasses_styles[shape]
-        
-        return glasses_styles["oval"]
+    def latency_percentiles(self, latencies):
+        if not latencies:
+            return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+        p50, p95, p99 = np.percentile(np.fromiter(latencies, dtype=np.float64), [50, 95, 99]) * 1000
+        return {"p50_ms": round(p50, 1), "p95_ms": round(p95, 1), "p99_ms": round(p99, 1)}
 
-    def suggest_earring_styles(self, face_shape):
-        earring_styles = {
-            "oval": ["hoops", "teardrops", "long dangles"],
-            "round": ["drop earrings", "vertical lines", "angled studs"],
-            "heart": ["teardrop", "chandelier", "bottom-heavy styles"],
-            "square": ["round hoops", "curved designs", "drops"],
-            "oblong": ["cluster studs", "short danglers", "wide designs"],
-            "diamond": ["elongated shapes", "geometric designs", "medium-length drops"]
+    def snapshot(self, queue_depth, worker_count):
+        uptime_seconds = time.time() - self.started_at
+        return {
+            "uptime_seconds": round(uptime_seconds, 1),
+            "workers": worker_count,
+            "queue_depth": queue_depth,
+            "requests_completed": self.requests_completed,
+            "requests_failed": self.requests_failed,
+            "requests_rejected": self.requests_rejected,
+            "throughput_per_second": round(self.requests_completed / max(uptime_seconds, 1e-9), 2),
+            "batches_dispatched": self.batches_dispatched,
+            "average_batch_size": round(self.batched_requests / max(self.batches_dispatched, 1), 2),
+            "largest_batch": self.largest_batch,
+            "latency": self.latency_percentiles(self.request_latencies),
+            "queue_wait": self.latency_percentiles(self.queue_latencies)
         }
-        
-        for shape in earring_styles:
-            if shape in face_shape.lower():
-                return earring_styles[shape]
-        
-        return earring_styles["oval"]
 
-    def recommend_makeup_products(self, skin_tone):
-        if "warm" in skin_tone:
-            return [
-                "Bronze or peach blush",
-                "Gold or copper eyeshadow",
-                "Coral or terracotta lips",
-                "Warm-toned highlighter"
-            ]
-        elif "cool" in skin_tone:
-            return [
-                "Rosy or berry blush",
-                "Cool-toned eyeshadow (taupe, mauve)",
-                "Berry or mauve lips",
-                "Icy highlighter"
-            ]
+class AnalysisService:
+    def __init__(self, worker_count, queue_size=64, batch_size=8, batch_window=0.005, recommendation_seed=None, max_num_faces=1,
+                 max_upload_bytes=10 * 1024 * 1024):
+        self.worker_count = worker_count
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.recommendation_seed = recommendation_seed
+        self.max_num_faces = max_num_faces
+        self.max_upload_bytes = max_upload_bytes
+        self.metrics = ServiceMetrics()
+        self.executor = None
+        self.pending_requests = None
+        self.batch_slots = None
+        self.batch_dispatcher = None
+        self.running_batches = set()
+        self.busy_workers = 0
+
+    async def start(self, host, port):
+        event_loop = asyncio.get_running_loop()
+        self.executor = ProcessPoolExecutor(self.worker_count, initializer=initialize_service_worker,
+                                            initargs=(self.recommendation_seed, self.max_num_faces))
+        await asyncio.gather(*(event_loop.run_in_executor(self.executor, warm_up_service_worker) for _ in range(self.worker_count)))
+        
+        self.pending_requests = asyncio.Queue(self.queue_size)
+        self.batch_slots = asyncio.Semaphore(self.worker_count)
+        self.batch_dispatcher = asyncio.create_task(self.dispatch_batches())
+        return await asyncio.start_server(self.handle_connection, host, port, limit=64 * 1024)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    async def dispatch_batches(self):
+        while True:
+            await self.batch_slots.acquire()
+            request_batch = [await self.pending_requests.get()]
+            if self.pending_requests.empty() and self.batch_window > 0:
+                await asyncio.sleep(self.batch_window)
+            idle_workers = self.worker_count - self.busy_workers
+            batch_limit = min(self.batch_size, -(-(len(request_batch) + self.pending_requests.qsize()) // idle_workers))
+            while len(request_batch) < batch_limit and not self.pending_requests.empty():
+                request_batch.append(self.pending_requests.get_nowait())
+            
+            self.busy_workers += 1
+            batch_task = asyncio.create_task(self.run_batch(request_batch))
+            self.running_batches.add(batch_task)
+            batch_task.add_done_callback(self.running_batches.discard)
+
+    async def run_batch(self, request_batch):
+        self.metrics.record_batch(len(request_batch))
+        dispatched_at = time.perf_counter()
+        try:
+            batch_results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, analyze_encoded_images, [encoded_image for encoded_image, response_future, queued_at in request_batch]
+            )
+        except Exception as error:
+            for encoded_image, response_future, queued_at in request_batch:
+                if not response_future.done():
+                    response_future.set_exception(error)
         else:
-            return [
-                "Neutral blush (dusty rose)",
-                "Brown or bronze eyeshadow",
-                "Nude or pink lipstick",
-                "Champagne highlighter"
-            ]
+            for (encoded_image, response_future, queued_at), (image_result, analysis_seconds) in zip(request_batch, batch_results):
+                if not response_future.done():
+                    response_future.set_result((image_result, dispatched_at - queued_at, analysis_seconds))
+        finally:
+            self.busy_workers -= 1
+            self.batch_slots.release()
 
-    def suggest_jewelry_metals(self, skin_tone):
-        if "warm" in skin_tone:
-            return ["Gold", "Rose gold", "Brass", "Copper"]
-        elif "cool" in skin_tone:
-            return ["Silver", "White gold", "Platinum", "Palladium"]
+    async def analyze_upload(self, encoded_image):
+        if not encoded_image:
+            return 400, {"error": "send the JPEG or PNG file as the request body"}, ()
+        
+        response_future = asyncio.get_running_loop().create_future()
+        queued_at = time.perf_counter()
+        try:
+            self.pending_requests.put_nowait((encoded_image, response_future, queued_at))
+        except asyncio.QueueFull:
+            self.metrics.requests_rejected += 1
+            return 503, {"error": "analysis queue is full, retry shortly"}, (("Retry-After", "1"),)
+        
+        try:
+            image_result, queue_seconds, analysis_seconds = await response_future
+        except Exception as error:
+            self.metrics.record_request(False, time.perf_counter() - queued_at, time.perf_counter() - queued_at)
+            return 500, {"error": f"analysis failed: {error}"}, ()
+        
+        total_seconds = time.perf_counter() - queued_at
+        self.metrics.record_request("error" not in image_result, queue_seconds, total_seconds)
+        timing_header = (
+            f"queue;dur={queue_seconds * 1000:.1f}, analysis;dur={analysis_seconds * 1000:.1f}, total;dur={total_seconds * 1000:.1f}"
+        )
+        if image_result.get("error") == "could not decode image":
+            status = 400
+        elif "error" in image_result:
+            status = 422
         else:
-            return ["Gold", "Silver", "Rose gold", "Mixed metals"]
+            status = 200
+        return status, image_result, (("Server-Timing", timing_header),)
 
-if __name__ == "__main__":
-    application_window = tk.Tk()
-    beauty_app = BeautyAdvisor(application_window)
+    async def route_request(self, method, path, body):
+        if path == "/analyze":
+            if method != "POST":
+                return 405, {"error": "use POST with the image as the request body"}, (("Allow", "POST"),)
+            return await self.analyze_upload(body)
+        if path == "/metrics":
+            if method != "GET":
+                return 405, {"error": "use GET"}, (("Allow", "GET"),)
+            return 200, self.metrics.snapshot(self.pending_requests.qsize(), self.worker_count), ()
+        return 404, {"error": f"unknown path {path}"}, ()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    http_request = await read_http_request(reader, self.max_upload_bytes)
+                except HttpRequestError as error:
+                    await write_http_response(writer, error.status, {"error": str(error)}, keep_alive=False)
+                    break
+                if http_request is None:
+                    break
+                
+                method, path, body, keep_alive = http_request
+                status, payload, extra_headers = await self.route_request(method, path, body)
+                await write_http_response(writer, status, payload, extra_headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+async def serve_analysis_requests(analysis_service, host, port):
+    server = await analysis_service.start(host, port)
+    print(f"Serving face analysis on http://{host}:{port} with {analysis_service.worker_count} warm worker(s)", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+def run_analysis_service(host, port, worker_count, queue_size=64, batch_size=8, batch_window=0.005, recommendation_seed=None, max_num_faces=1):
+    analysis_service = AnalysisService(worker_count, queue_size, batch_size, batch_window, recommendation_seed, max_num_faces)
+    try:
+        asyncio.run(serve_analysis_requests(analysis_service, host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        analysis_service.shutdown()
+
+def describe_result_store(path, prune=False, clear=False):
+    if not os.path.exists(path):
+        sys.exit(f"No result cache at {path}")
+    result_store = AnalysisResultStore(path, None)
+    try:
+        if clear:
+            print(f"Deleted {result_store.clear()} stored result(s)")
+        elif prune:
+            print(f"Deleted {result_store.remove_stale_results()} result(s) from older analysis code")
+        for pipeline_version, entry_count, is_current in result_store.describe():
+            print(f"{entry_count:>8}  {pipeline_version}{'' if is_current else '  (stale)'}")
+    finally:
+        result_store.close()
+
+def launch_gui(frame_source=0, track_landmarks=False, max_num_faces=1, show_performance_hud=False, metrics_path=None, metrics_interval=10.0, live_analysis=False, overlay_density=None, result_store_path=None,
+               quality_gate=None, performance_profile="quality", target_fps=None, idle_after_frames=0, pause_when_minimized=False):
+    configure_face_mesh(max_num_faces, PERFORMANCE_PROFILES[performance_profile]["refine_landmarks"])
+    result_store = None
+    if result_store_path is not None:
+        result_store = AnalysisResultStore(result_store_path, analysis_pipeline_version("gui", max_num_faces=max_num_faces))
+    performance_monitor.enabled = show_performance_hud or metrics_path is not None
+    performance_monitor.frame_gate = quality_gate
+    if metrics_path is not None:
+        performance_monitor.start_metrics_dump(metrics_path, metrics_interval)
+    
+    application_window = load_tkinter().Tk()
+    beauty_app = BeautyAdvisor(application_window, frame_source, track_landmarks, show_performance_hud, live_analysis, overlay_density, result_store, quality_gate,
+                               performance_profile, target_fps, idle_after_frames, pause_when_minimized)
     application_window.protocol("WM_DELETE_WINDOW", beauty_app.close_application)
-    application_window.mainloop()
\ No newline at end of file
+    application_window.mainloop()
+    if metrics_path is not None:
+        performance_monitor.write_metrics_file(metrics_path)
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Beauty Advisor Pro")
+    parser.add_argument("--source", default="0", help="camera index, video file or stream URL for the live view (default: 0)")
+    parser.add_argument("--track", action="store_true", help="reuse landmarks on still frames instead of running Face Mesh every frame")
+    parser.add_argument("--full-frame", action="store_true", help="always run Face Mesh on the whole frame instead of a crop around the face (still resized by --profile)")
+    parser.add_argument("--hud", action="store_true", help="show frame rate and per-stage latency on the live view")
+    parser.add_argument("--live", action="store_true", help="keep analyzing the live view and show results once they are stable")
+    parser.add_argument("--gate", action="store_true", help="skip Face Mesh on dark, overexposed, blurry or faceless frames and say what to fix (live view and 'stream' only)")
+    parser.add_argument("--face-cascade", help="OpenCV Haar cascade the quality gate uses to check for a face (default: OpenCV's frontal face cascade, if installed)")
+    parser.add_argument("--result-cache", help="SQLite file of earlier results to reuse when a capture looks like one analyzed before")
+    parser.add_argument("--overlay", choices=OVERLAY_DENSITIES, help="face mesh overlay detail; 'contours' or 'minimal' draw less on slow machines (default: set by --profile)")
+    parser.add_argument("--profile", choices=PERFORMANCE_PROFILE_NAMES + ("auto",), default="quality",
+                        help="Face Mesh refinement, inference resolution, overlay detail and refresh rate for the live view; "
+                             "'auto' measures the first frames with a face and steps down until --target-fps is met (default: quality)")
+    parser.add_argument("--target-fps", type=float, default=20.0, help="frame rate --profile auto aims for (default: 20)")
+    parser.add_argument("--idle-after", type=int, default=0, metavar="FRAMES",
+                        help="after this many frames without a face, only check for one twice a second until someone shows up (default: 0, never)")
+    parser.add_argument("--pause-minimized", action="store_true", help="stop drawing the live view while the window is minimized")
+    parser.add_argument("--metrics-file", help="periodically write live-view timings to this file in Prometheus text format")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between metrics file updates (default: 10)")
+    parser.add_argument("--max-faces", type=int, default=1, help="analyze up to this many faces per frame, e.g. for group kiosks (default: 1)")
+    subcommands = parser.add_subparsers(dest="command")
+    
+    analyze_parser = subcommands.add_parser("analyze", help="analyze a directory of photos without opening a window")
+    analyze_parser.add_argument("directory", help="folder of .jpg/.png photos")
+    analyze_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (default: all cores)")
+    analyze_parser.add_argument("--output", help="JSONL file to write results to (default: stdout)")
+    analyze_parser.add_argument("--recursive", action="store_true", help="also analyze photos in subfolders")
+    analyze_parser.add_argument("--seed", type=int, help="seed the hair highlight picks so repeated runs give the same output")
+    analyze_parser.add_argument("--max-faces", type=int, default=argparse.SUPPRESS, help="analyze up to this many faces per frame, e.g. for group kiosks (default: 1)")
+    analyze_parser.add_argument("--cache", help="SQLite file of earlier results; near-identical photos are answered from it instead of being analyzed again")
+    
+    stream_parser = subcommands.add_parser("stream", help="analyze a video file, camera or stream URL frame by frame")
+    stream_parser.add_argument("source", help="camera index, video file or stream URL")
+    stream_parser.add_argument("--stride", type=int, default=1, help="analyze every Nth frame (default: 1)")
+    stream_parser.add_argument("--adaptive", action="store_true", help="drop frames whenever analysis falls behind the playback speed, or behind real time for cameras and stream URLs")
+    stream_parser.add_argument("--gate", action="store_true", default=argparse.SUPPRESS, help="skip Face Mesh on dark, overexposed, blurry or faceless frames")
+    stream_parser.add_argument("--face-cascade", default=argparse.SUPPRESS, help="OpenCV Haar cascade the quality gate uses to check for a face (default: OpenCV's frontal face cascade, if installed)")
+    stream_parser.add_argument("--record", help="also save landmarks and skin color samples to this file so 'replay' can re-run the analysis without Face Mesh")
+    stream_parser.add_argument("--live", action="store_true", default=argparse.SUPPRESS, help="aggregate frames and only write results when they become stable or change")
+    stream_parser.add_argument("--speed", type=float, default=1.0, help="playback speed to keep up with in adaptive mode (default: 1.0)")
+    stream_parser.add_argument("--output", help="JSONL file to write results to (default: stdout)")
+    stream_parser.add_argument("--seed", type=int, help="seed the hair highlight picks so repeated runs give the same output")
+    stream_parser.add_argument("--track", action="store_true", default=argparse.SUPPRESS, help="reuse landmarks on still frames instead of running Face Mesh every frame")
+    stream_parser.add_argument("--full-frame", action="store_true", default=argparse.SUPPRESS, help="always run Face Mesh on the whole frame instead of a crop around the face")
+    stream_parser.add_argument("--max-faces", type=int, default=argparse.SUPPRESS, help="analyze up to this many faces per frame, e.g. for group kiosks (default: 1)")
+    
+    replay_parser = subcommands.add_parser("replay", help="re-run the analysis and recommendations on a recording made with 'stream --record'")
+    replay_parser.add_argument("recording", help="landmark recording file")
+    replay_parser.add_argument("--output", help="JSONL file to write results to (default: stdout)")
+    replay_parser.add_argument("--seed", type=int, help="seed the hair highlight picks so repeated runs give the same output")
+    
+    cache_parser = subcommands.add_parser("cache", help="show or clean up a result cache used with 'analyze --cache' or '--result-cache'")
+    cache_parser.add_argument("path", help="SQLite result cache file")
+    cache_parser.add_argument("--prune", action="store_true", help="delete results stored by an older version of the analysis code")
+    cache_parser.add_argument("--clear", action="store_true", help="delete every stored result")
+    
+    serve_parser = subcommands.add_parser("serve", help="run a local HTTP service that analyzes uploaded photos")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=8000, help="port to listen on (default: 8000)")
+    serve_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes, each with a warm Face Mesh (default: all cores)")
+    serve_parser.add_argument("--queue-size", type=int, default=64, help="uploads waiting for a worker before new ones get 503 (default: 64)")
+    serve_parser.add_argument("--batch-size", type=int, default=8, help="most uploads sent to one worker at a time (default: 8)")
+    serve_parser.add_argument("--batch-window-ms", type=float, default=5.0, help="how long to wait for more uploads to batch together (default: 5)")
+    serve_parser.add_argument("--seed", type=int, help="seed the hair highlight picks so repeated uploads give the same output")
+    serve_parser.add_argument("--max-faces", type=int, default=argparse.SUPPRESS, help="analyze up to this many faces per frame, e.g. for group kiosks (default: 1)")
+    
+    options = parser.parse_args(arguments)
+    if options.command not in (None, "stream"):
+        for option_name, option_value in (("--gate", options.gate), ("--face-cascade", options.face_cascade)):
+            if option_value:
+                parser.error(f"{option_name} only applies to the live view and 'stream', not '{options.command}'")
+    if options.full_frame:
+        landmark_cache.region_selector = RegionOfInterestSelector(full_frame_interval=0)
+    quality_gate = None
+    if options.gate:
+        quality_gate = FrameQualityGate("bgr" if options.command == "stream" else "rgb", options.face_cascade)
+        if quality_gate.face_detector is None:
+            print("Quality gate: no face cascade found, only checking exposure and sharpness", file=sys.stderr)
+    
+    if options.command == "analyze":
+        if options.output:
+            with open(options.output, "w") as output_file:
+                run_batch_analysis(options.directory, options.workers, output_file, options.recursive, options.seed, options.max_faces, options.cache)
+        else:
+            run_batch_analysis(options.directory, options.workers, sys.stdout, options.recursive, options.seed, options.max_faces, options.cache)
+    elif options.command == "stream":
+        if options.output:
+            with open(options.output, "w") as output_file:
+                run_stream_analysis(options.source, output_file, options.stride, options.adaptive, options.speed, options.track, not options.full_frame,
+                                    options.seed, options.max_faces, options.live, quality_gate, options.record)
+        else:
+            run_stream_analysis(options.source, sys.stdout, options.stride, options.adaptive, options.speed, options.track, not options.full_frame,
+                                options.seed, options.max_faces, options.live, quality_gate, options.record)
+    elif options.command == "replay":
+        if options.output:
+            with open(options.output, "w") as output_file:
+                replay_landmark_recording(options.recording, output_file, options.seed)
+        else:
+            replay_landmark_recording(options.recording, sys.stdout, options.seed)
+    elif options.command == "cache":
+        describe_result_store(options.path, options.prune, options.clear)
+    elif options.command == "serve":
+        run_analysis_service(options.host, options.port, options.workers, options.queue_size, options.batch_size,
+                             options.batch_window_ms / 1000, options.seed, options.max_faces)
+    else:
+        performance_profile, target_fps = options.profile, None
+        if options.profile == "auto":
+            performance_profile, target_fps = PERFORMANCE_PROFILE_NAMES[0], options.target_fps
+        launch_gui(options.source, options.track, options.max_faces, options.hud, options.metrics_file, options.metrics_interval, options.live, options.overlay, options.result_cache, quality_gate,
+                   performance_profile, target_fps, options.idle_after, options.pause_minimized)
+
+if __name__ == "__main__":
+    main()
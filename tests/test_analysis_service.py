@@ -0,0 +1,60 @@
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
+
+
+def read_request(raw_request):
+    async def parse():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw_request)
+        reader.feed_eof()
+        return await main.read_http_request(reader, 1024)
+    return asyncio.run(parse())
+
+
+@pytest.mark.parametrize("content_length", ["abc", "-5"])
+def test_invalid_content_length_is_a_bad_request(content_length):
+    with pytest.raises(main.HttpRequestError) as error:
+        read_request(f"POST /analyze HTTP/1.1\r\nContent-Length: {content_length}\r\n\r\n".encode("latin-1"))
+    assert error.value.status == 400
+
+
+def test_valid_content_length_reads_the_body():
+    method, path, body, keep_alive = read_request(b"POST /analyze?x=1 HTTP/1.1\r\nContent-Length: 3\r\n\r\nabc")
+    assert (method, path, body, keep_alive) == ("POST", "/analyze", b"abc", True)
+
+
+def test_burst_is_spread_across_idle_workers(monkeypatch):
+    batch_sizes = []
+
+    def analyze_slowly(encoded_images):
+        batch_sizes.append(len(encoded_images))
+        time.sleep(0.05)
+        return [({"ok": True}, 0.05) for _ in encoded_images]
+
+    monkeypatch.setattr(main, "analyze_encoded_images", analyze_slowly)
+
+    async def run_burst():
+        analysis_service = main.AnalysisService(worker_count=4, batch_size=8)
+        analysis_service.executor = ThreadPoolExecutor(4)
+        analysis_service.pending_requests = asyncio.Queue()
+        analysis_service.batch_slots = asyncio.Semaphore(4)
+        response_futures = []
+        for _ in range(8):
+            response_future = asyncio.get_running_loop().create_future()
+            analysis_service.pending_requests.put_nowait((b"image", response_future, time.perf_counter()))
+            response_futures.append(response_future)
+        batch_dispatcher = asyncio.create_task(analysis_service.dispatch_batches())
+        await asyncio.gather(*response_futures)
+        batch_dispatcher.cancel()
+        analysis_service.executor.shutdown()
+
+    asyncio.run(run_burst())
+    assert batch_sizes == [2, 2, 2, 2]
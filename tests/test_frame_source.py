@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
+
+
+class FakeCapture:
+    def __init__(self, frame_count, reported_fps, delivered_fps, first_read_seconds=0.0):
+        self.frame_count = frame_count
+        self.reported_fps = reported_fps
+        self.delivery_interval = 1.0 / delivered_fps
+        self.first_read_seconds = first_read_seconds
+        self.frames_delivered = 0
+        self.grabs = 0
+
+    def get(self, property_id):
+        return self.reported_fps if property_id == cv2.CAP_PROP_FPS else 0.0
+
+    def deliver_frame(self):
+        if self.frames_delivered >= self.frame_count:
+            return False
+        time.sleep(self.first_read_seconds if self.frames_delivered == 0 else self.delivery_interval)
+        self.frames_delivered += 1
+        return True
+
+    def read(self, frame=None):
+        if not self.deliver_frame():
+            return False, None
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def grab(self):
+        self.grabs += 1
+        return self.deliver_frame()
+
+    def release(self):
+        self.frame_count = self.frames_delivered
+
+
+def fake_frame_source(source, capture):
+    frame_source = main.FrameSource(source)
+    frame_source.capture = capture
+    return frame_source
+
+
+def consume_frames(frame_source, **frame_options):
+    return [frame_id for frame_id, timestamp, frame in frame_source.frames(**frame_options)]
+
+
+def test_camera_with_slow_first_read_yields_every_frame():
+    camera = FakeCapture(frame_count=30, reported_fps=30, delivered_fps=30, first_read_seconds=0.4)
+    frame_source = fake_frame_source(0, camera)
+    frame_ids = consume_frames(frame_source, adaptive=True, paced=True, skip_frames=lambda: 5)
+    assert frame_ids == list(range(30))
+    assert camera.grabs == 0
+    assert frame_source.skipped_frames == 0
+
+
+def test_camera_delivering_below_reported_rate_yields_every_frame():
+    camera = FakeCapture(frame_count=40, reported_fps=30, delivered_fps=25)
+    frame_source = fake_frame_source("rtsp://camera/stream", camera)
+    frame_ids = consume_frames(frame_source, adaptive=True, paced=True)
+    assert frame_ids == list(range(40))
+    assert camera.grabs == 0
+
+
+def test_live_stream_drops_stale_frames_when_analysis_falls_behind():
+    camera = FakeCapture(frame_count=60, reported_fps=100, delivered_fps=100)
+    frame_source = fake_frame_source("rtsp://camera/stream", camera)
+    frames_seen = []
+    for frame_id, timestamp, frame in frame_source.frames(adaptive=True):
+        frames_seen.append((frame_id, timestamp, time.perf_counter()))
+        time.sleep(0.05)
+    frame_ids = [frame_id for frame_id, timestamp, seen_at in frames_seen]
+    assert frame_ids[-1] >= 55
+    assert len(frame_ids) < 30
+    assert frame_source.skipped_frames == 60 - len(frame_ids)
+    lag_seconds = [seen_at - timestamp for frame_id, timestamp, seen_at in frames_seen]
+    assert max(lag_seconds) - min(lag_seconds) < 0.1
+
+
+def test_live_source_stamps_frames_with_arrival_time():
+    camera = FakeCapture(frame_count=5, reported_fps=30, delivered_fps=10)
+    frame_source = fake_frame_source(0, camera)
+    timestamps = [timestamp for frame_id, timestamp, frame in frame_source.frames()]
+    assert timestamps[-1] >= 0.35
+
+
+def test_release_stops_the_frame_reader():
+    camera = FakeCapture(frame_count=1000, reported_fps=100, delivered_fps=100)
+    frame_source = fake_frame_source(0, camera)
+    for frame_id, timestamp, frame in frame_source.frames(adaptive=True):
+        break
+    frame_source.release()
+    frames_delivered = camera.frames_delivered
+    time.sleep(0.05)
+    assert frame_source.frame_reader is None
+    assert camera.frames_delivered == frames_delivered
+
+
+def test_video_file_still_skips_frames_when_analysis_falls_behind():
+    video = FakeCapture(frame_count=60, reported_fps=100, delivered_fps=10000)
+    frame_source = fake_frame_source("clip.avi", video)
+    frame_ids = []
+    for frame_id, timestamp, frame in frame_source.frames(adaptive=True):
+        frame_ids.append(frame_id)
+        time.sleep(0.03)
+    assert video.grabs > 0
+    assert len(frame_ids) < 60
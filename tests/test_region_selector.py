@@ -0,0 +1,33 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
+
+
+def fake_face_detector(face_box, region_sizes):
+    def detect_region(region_image):
+        region_sizes.append(region_image.shape[:2])
+        left, top, right, bottom = face_box
+        corners = [(left, top), (right, top), (left, bottom), (right, bottom)]
+        return [SimpleNamespace(landmark=[SimpleNamespace(x=x_pos, y=y_pos, z=0.0) for x_pos, y_pos in corners])]
+    return detect_region
+
+
+def test_changing_inference_scale_drops_the_cached_region():
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    region_selector = main.RegionOfInterestSelector(inference_scale=1.0)
+    region_sizes = []
+    detect_region = fake_face_detector((0.4, 0.4, 0.6, 0.6), region_sizes)
+    region_selector.detect(frame, detect_region)
+    region_selector.detect(frame, detect_region)
+    assert region_selector.current_region[1] == 1.0
+    
+    region_selector.set_inference_scale(0.5)
+    assert region_selector.current_region is None and region_selector.previous_face_box is None
+    region_sizes.clear()
+    region_selector.detect(frame, detect_region)
+    assert region_sizes[0] == (240, 320)
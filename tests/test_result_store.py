@@ -0,0 +1,96 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main
+
+
+@pytest.fixture
+def result_store(tmp_path):
+    analysis_result_store = main.AnalysisResultStore(str(tmp_path / "results.db"), "test-version", max_entries=50, max_distance=10)
+    yield analysis_result_store
+    analysis_result_store.close()
+
+
+def random_hash(random_generator):
+    return random_generator.integers(0, 256, 32, dtype=np.uint8).tobytes()
+
+
+def flip_bits(image_hash, bit_positions):
+    hash_bits = np.unpackbits(np.frombuffer(image_hash, dtype=np.uint8))
+    hash_bits[bit_positions] ^= 1
+    return np.packbits(hash_bits).tobytes()
+
+
+def test_near_duplicate_with_flips_spread_across_bands_is_found(result_store):
+    random_generator = np.random.default_rng(1)
+    image_hash = random_hash(random_generator)
+    result_store.store(image_hash, {"face_shape": "oval"})
+    band_bits = 8 * len(image_hash) // main.PERCEPTUAL_HASH_BANDS
+    for flipped_bands in (range(result_store.max_distance), range(main.PERCEPTUAL_HASH_BANDS - result_store.max_distance, main.PERCEPTUAL_HASH_BANDS)):
+        near_duplicate = flip_bits(image_hash, [band * band_bits + band % band_bits for band in flipped_bands])
+        assert result_store.lookup(near_duplicate) == {"face_shape": "oval"}
+
+
+def test_hash_beyond_max_distance_is_a_miss(result_store):
+    random_generator = np.random.default_rng(2)
+    image_hash = random_hash(random_generator)
+    result_store.store(image_hash, {"face_shape": "oval"})
+    assert result_store.lookup(flip_bits(image_hash, list(range(0, 256, 16)))) is None
+    assert result_store.lookup(random_hash(random_generator)) is None
+
+
+def test_store_trims_oldest_results_once_over_capacity(result_store):
+    random_generator = np.random.default_rng(3)
+    image_hashes = [random_hash(random_generator) for _ in range(120)]
+    for result_index, image_hash in enumerate(image_hashes):
+        result_store.store(image_hash, {"index": result_index})
+    entry_count, = result_store.connection.execute("SELECT COUNT(*) FROM results").fetchone()
+    band_count, = result_store.connection.execute("SELECT COUNT(*) FROM result_bands").fetchone()
+    assert entry_count <= result_store.max_entries
+    assert band_count == entry_count * main.PERCEPTUAL_HASH_BANDS
+    assert result_store.lookup(image_hashes[-1]) == {"index": 119}
+    assert result_store.lookup(image_hashes[0]) is None
+
+
+def test_band_probes_use_the_band_index(result_store):
+    query_plan = " ".join(str(plan_row) for plan_row in result_store.connection.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM results WHERE pipeline_version = ? AND id IN "
+        "(SELECT result_id FROM result_bands WHERE band_key IN (?, ?))", ("test-version", 1, 2)
+    ))
+    assert "USING INDEX result_bands_key" in query_plan
+
+
+def test_pipeline_digest_covers_skin_sampling_regions(monkeypatch):
+    original_digest = main.analysis_pipeline_digest()
+    monkeypatch.setattr(main, "SKIN_SAMPLING_REGIONS", main.SKIN_SAMPLING_REGIONS[:2])
+    assert main.analysis_pipeline_digest() != original_digest
+
+
+def test_lookup_skips_near_duplicates_the_caller_rejects(result_store):
+    random_generator = np.random.default_rng(6)
+    image_hash = random_hash(random_generator)
+    result_store.store(image_hash, {"skin_tone": "cool"})
+    result_store.store(flip_bits(image_hash, [3]), {"skin_tone": "warm"})
+    assert result_store.lookup(image_hash) == {"skin_tone": "cool"}
+    assert result_store.lookup(image_hash, lambda stored_result: stored_result["skin_tone"] == "warm") == {"skin_tone": "warm"}
+    assert result_store.lookup(image_hash, lambda stored_result: False) is None
+    assert result_store.misses == 1
+
+
+def test_face_region_hash_ignores_the_background():
+    random_generator = np.random.default_rng(7)
+    image = random_generator.integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    landmark_points = np.array([[100, 60, 0], [220, 60, 0], [160, 200, 0]], dtype=np.float32)
+    face_hash = main.face_region_hash(image, [landmark_points])
+    assert main.face_region_hash(image, [landmark_points + np.float32([1.5, -1.5, 0])]) == face_hash
+    changed_background = image.copy()
+    changed_background[:, :60] = random_generator.integers(0, 256, (240, 60, 3), dtype=np.uint8)
+    changed_background[:, 260:] = 0
+    assert main.face_region_hash(changed_background, [landmark_points]) == face_hash
+    changed_face = image.copy()
+    changed_face[60:200, 100:220] = random_generator.integers(0, 256, (140, 120, 3), dtype=np.uint8)
+    assert main.face_region_hash(changed_face, [landmark_points]) != face_hash